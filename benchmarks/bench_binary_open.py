@@ -0,0 +1,77 @@
+"""Ouverture d'un registre binaire: colonnes projetées (ExpenseManager.attach)
+contre copie par paquets, puis listage progressif comme dans l'interface."""
+import os
+import sys
+import tempfile
+import time
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.ledger import BinaryRepository
+from expense_tracker.search import build_postings
+
+# Même taille de paquet que LIST_CHUNK dans l'interface.
+CHUNK = 50_000
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def copied(repository):
+    manager = tracker.ExpenseManager()
+    for columns in repository.iter_columns():
+        manager.add_columns(*columns)
+    return manager
+
+
+def listed(manager):
+    # Formatage des ID et tokenisation sur le thread de chargement; index et
+    # filtrage des lignes supprimées sur la boucle Tk.
+    base = manager._base
+    manager.index_descriptions(base=False)
+    background = foreground = 0.0
+    for start in range(0, len(base), CHUNK):
+        stop = min(start + CHUNK, len(base))
+        seconds, (ids, postings) = timed(lambda: (base.format_ids(start, stop),
+                                                  build_postings(base.descriptions(slice(start, stop)))))
+        background += seconds
+        seconds, _ = timed(lambda: (manager.index_postings(start, postings), manager.live_ids(start, ids)))
+        foreground += seconds
+    return background, foreground
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        repository = BinaryRepository(os.path.join(directory, "depenses.bin"), os.path.join(directory, "revenu.csv"))
+        rows = synthetic_rows(count, tracker.categories)
+        while True:
+            chunk = [row for _, row in zip(range(CHUNK), rows)]
+            if not chunk:
+                break
+            repository.add_many(chunk)
+        print(f"{count} dépenses")
+
+        seconds, manager = timed(copied, repository)
+        print(f"  copie (iter_columns)           {seconds * 1000:10.1f} ms  {len(manager)} dépenses")
+        del manager
+        seconds, manager = timed(tracker.load_manager, repository, tracker.ExpenseManager())
+        print(f"  colonnes projetées (attach)    {seconds * 1000:10.1f} ms  total {manager.total():.2f}")
+        background, foreground = listed(manager)
+        print(f"  listage: ID et tokenisation    {background * 1000:10.1f} ms  (thread de chargement)")
+        print(f"  listage: index et filtrage     {foreground * 1000:10.1f} ms  (boucle Tk)")
+        ids = manager.ids()
+        seconds, _ = timed(manager.get_expense, ids[len(ids) // 2])
+        print(f"  première lecture par ID        {seconds * 1000:10.1f} ms  (tri des ID)")
+        seconds, _ = timed(manager.get_expense, ids[len(ids) // 3])
+        print(f"  lecture par ID                 {seconds * 1000:10.3f} ms")
+        seconds, _ = timed(manager.search, "pharm")
+        print(f"  recherche                      {seconds * 1000:10.2f} ms")
+        repository.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
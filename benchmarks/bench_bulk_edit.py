@@ -0,0 +1,72 @@
+"""Suppression et changement de catégorie par lots de 1000 dépenses, contre
+les mêmes opérations une par une, pour chaque stockage."""
+import os
+import sys
+import tempfile
+import time
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.ledger import BinaryRepository
+
+BATCH = 1000
+
+
+def filled(repository, rows):
+    repository.add_many(rows)
+    manager = tracker.ExpenseManager()
+    for row in rows:
+        manager.add_expense(tracker.expense_from_row(row))
+    return manager
+
+
+def run(repository, rows):
+    manager = filled(repository, rows)
+    results = {}
+    one_by_one, batch, recategorized = (rows[i * BATCH:(i + 1) * BATCH] for i in range(3))
+
+    start = time.perf_counter()
+    for row in one_by_one:
+        manager.remove_expense(row[0])
+        repository.remove(row[0])
+    results["suppression une par une"] = time.perf_counter() - start
+
+    ids = [row[0] for row in batch]
+    start = time.perf_counter()
+    manager.remove_expenses(ids)
+    repository.remove_many(ids)
+    results["suppression par lot"] = time.perf_counter() - start
+
+    ids = [row[0] for row in recategorized]
+    start = time.perf_counter()
+    changed = manager.recategorize(ids, "Loisirs")
+    repository.replace_many([manager.get_expense(id).to_row() for id in changed])
+    results["catégorie par lot"] = time.perf_counter() - start
+
+    stored = sorted(map(tuple, repository.load()))
+    assert stored == sorted(tuple(expense.to_row()) for expense in manager), "stockage et manager divergent"
+    assert manager.check_indexes()
+    return results
+
+
+def main(count):
+    rows = list(synthetic_rows(count, tracker.categories))
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            "csv": tracker.CsvRepository(os.path.join(directory, "depenses.csv"),
+                                         os.path.join(directory, "revenu.csv")),
+            "sqlite": tracker.SqliteRepository(os.path.join(directory, "depenses.db")),
+            "binaire": BinaryRepository(os.path.join(directory, "depenses.bin"), os.path.join(directory, "revenu.csv")),
+        }
+        print(f"{count} dépenses, lots de {BATCH}")
+        for name, repository in backends.items():
+            results = run(repository, rows)
+            repository.close()
+            print(f"  {name}")
+            for label, seconds in results.items():
+                print(f"    {label:<26} {seconds * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,42 @@
+"""Débit de l'import en parallèle (lignes/s) selon le nombre de processus."""
+import csv
+import os
+import sys
+import tempfile
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.bulk_import import bulk_import
+from expense_tracker.storage import HEADER
+
+
+def write_files(directory, files, rows_per_file):
+    paths = []
+    for number in range(files):
+        path = os.path.join(directory, f"depenses-{number:03d}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(HEADER)
+            writer.writerows(synthetic_rows(rows_per_file, tracker.categories, seed=number))
+        paths.append(path)
+    return paths
+
+
+def main(files, rows_per_file):
+    worker_counts = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(directory, files, rows_per_file)
+        print(f"{files} fichiers de {rows_per_file} lignes, {os.cpu_count()} CPU")
+        for workers in worker_counts:
+            manager = tracker.ExpenseManager()
+            repository = tracker.CsvRepository(os.path.join(directory, f"registre-{workers}.csv"),
+                                               os.path.join(directory, "revenu.csv"))
+            report = bulk_import(paths, manager, repository, workers=workers)
+            rows = report.imported + report.rejected + report.duplicates
+            print(f"  {workers:>2} processus  {report.seconds:7.2f} s  {rows / report.seconds:12,.0f} lignes/s")
+
+
+if __name__ == "__main__":
+    arguments = [int(arg) for arg in sys.argv[1:]]
+    main(*(arguments or [32, 20_000]))
@@ -0,0 +1,68 @@
+"""Export: ancien classeur openpyxl complet contre export en flux (xlsx, csv, parquet)."""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.export import export_expenses
+
+
+def legacy_xlsx(manager, path):
+    # Reproduit l'ancien export_to_excel: cellules stylées une par une puis
+    # seconde passe sur ws.columns pour les largeurs.
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Dépenses"
+    for col_num, col_name in enumerate(["Date", "Catégorie", "Montant", "Description"], 1):
+        cell = ws.cell(row=1, column=col_num, value=col_name)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+    for row_num, exp in enumerate(manager, 2):
+        ws.cell(row=row_num, column=1, value=exp.date)
+        ws.cell(row=row_num, column=2, value=exp.category)
+        ws.cell(row=row_num, column=3, value=exp.amount)
+        ws.cell(row=row_num, column=4, value=exp.description)
+        ws.cell(row=row_num, column=3).alignment = Alignment(horizontal="right")
+    for column_cells in ws.columns:
+        length = max(len(str(cell.value)) if cell.value else 0 for cell in column_cells)
+        ws.column_dimensions[column_cells[0].column_letter].width = length + 2
+    wb.save(path)
+
+
+def measure(action):
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(count):
+    manager = tracker.ExpenseManager()
+    for exp_id, date_str, category, amount, description in synthetic_rows(count, tracker.categories):
+        manager.add_expense(tracker.Expense(float(amount), category, date_str, exp_id, description))
+
+    with tempfile.TemporaryDirectory() as directory:
+        targets = [("xlsx (ancien)", lambda: legacy_xlsx(manager, os.path.join(directory, "ancien.xlsx")))]
+        for extension in (".xlsx", ".csv", ".parquet"):
+            path = os.path.join(directory, "export" + extension)
+            targets.append((extension[1:], lambda path=path: export_expenses(manager, path)))
+
+        print(f"{count} dépenses")
+        for name, action in targets:
+            elapsed, peak = measure(action)
+            print(f"  {name:<14} {elapsed:8.2f} s  {peak / 2**20:8.1f} Mo pic")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
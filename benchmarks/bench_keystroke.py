@@ -0,0 +1,39 @@
+"""Coût d'une frappe dans le champ Revenu selon la taille de l'historique.
+
+Compare le calcul du total des dépenses refait à chaque frappe (somme Python,
+puis somme NumPy) au total courant d'ExpenseManager."""
+import sys
+import time
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.aggregation import expense_total
+
+
+def per_call(action, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(sizes):
+    print(f"{'dépenses':>9}  {'somme Python':>14}  {'somme NumPy':>14}  {'total courant':>14}")
+    for count in sizes:
+        manager = tracker.ExpenseManager()
+        for exp_id, date_str, category, amount, description in synthetic_rows(count, tracker.categories):
+            manager.add_expense(tracker.Expense(float(amount), category, date_str, exp_id, description))
+        revenu = "2500.00"
+
+        def keystroke(total):
+            return lambda: float(revenu) - total()
+
+        timings = [per_call(keystroke(lambda: sum(exp.amount for exp in manager)), 3),
+                   per_call(keystroke(lambda: expense_total(manager)), 20),
+                   per_call(keystroke(manager.total), 10_000)]
+        print(f"{count:>9}  " + "  ".join(f"{seconds * 1000:11.4f} ms" for seconds in timings))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,47 @@
+"""Vue consolidée de plusieurs registres: résumés mensuels contre rechargement
+des dépenses de chaque registre, et coût d'ouverture d'un registre à la demande."""
+import os
+import sys
+import tempfile
+import time
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.aggregation import aggregate
+from expense_tracker.ledgers import LedgerSet
+
+
+def main(ledgers, count):
+    with tempfile.TemporaryDirectory() as directory:
+        ledger_set = LedgerSet(os.path.join(directory, "registres"))
+        names = [ledger_set.create(f"Registre {i}") for i in range(ledgers)]
+        for seed, name in enumerate(names):
+            repository = tracker.open_repository(None, ledger_set.location(name))
+            repository.add_many(synthetic_rows(count, tracker.categories, seed=seed))
+            repository.close()
+        print(f"{ledgers} registres de {count} dépenses")
+
+        start = time.perf_counter()
+        for name in names:
+            repository = tracker.open_repository(None, ledger_set.location(name))
+            aggregate(tracker.load_manager(repository), by=("month", "category"))
+            repository.close()
+        print(f"  rechargement de chaque registre      {time.perf_counter() - start:10.3f} s")
+
+        start = time.perf_counter()
+        ledger_set.consolidated(by=("month", "category"), names=names)
+        print(f"  résumés (premier calcul)             {time.perf_counter() - start:10.3f} s")
+
+        start = time.perf_counter()
+        results = ledger_set.consolidated(by=("month", "category"), names=names)
+        print(f"  résumés (déjà calculés)              {time.perf_counter() - start:10.3f} s  {len(results)} groupes")
+
+        start = time.perf_counter()
+        ledger = ledger_set.open(names[0])
+        print(f"  ouverture d'un registre              {time.perf_counter() - start:10.3f} s  {len(ledger.manager)} dépenses")
+        assert ledger_set.close_all() == []
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5, int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
@@ -0,0 +1,54 @@
+"""Compare la mémoire de ExpenseManager (colonnes) à l'ancienne liste d'objets."""
+import gc
+import sys
+import tracemalloc
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+
+
+class LegacyExpense:
+    # Ancienne représentation: un objet avec __dict__ et la date en texte.
+    def __init__(self, amount, category, date, id, description):
+        self.amount = amount
+        self.category = category
+        self.date = date
+        self.id = id
+        self.description = description
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main(count):
+    rows = list(synthetic_rows(count, tracker.categories))
+    # Chaque description est une nouvelle chaîne, comme après csv.reader.
+    rows = [[exp_id, date_str, category, amount, "".join(description)]
+            for exp_id, date_str, category, amount, description in rows]
+
+    def build_legacy():
+        return [LegacyExpense(float(amount), category, date_str, exp_id, description)
+                for exp_id, date_str, category, amount, description in rows]
+
+    def build_columnar():
+        manager = tracker.ExpenseManager()
+        for exp_id, date_str, category, amount, description in rows:
+            manager.add_expense(tracker.Expense(float(amount), category, date_str, exp_id, description))
+        return manager
+
+    print(f"{count} dépenses")
+    for name, build in (("liste d'objets", build_legacy), ("ExpenseManager", build_columnar)):
+        result, current, peak = measure(build)
+        print(f"  {name:<16} {current / 2**20:8.1f} Mo retenus  {peak / 2**20:8.1f} Mo pic")
+        del result
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,91 @@
+"""Écritures en arrière-plan sur un stockage lent.
+
+Chaque appel au stockage (CSV réel dans un dossier temporaire) est ralenti de
+--latency secondes. On mesure la durée des appels faits par le « thread Tk »
+(mise en file), le nombre d'écritures réellement faites après regroupement,
+puis on vérifie que le stockage relu correspond au manager après close().
+Code de sortie 1 si un appel dépasse --max-call-ms ou si les données divergent.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker import persistence
+from expense_tracker.persistence import PersistenceWorker
+
+
+class SlowRepository:
+    """Délègue à un vrai stockage en ajoutant `latency` secondes à chaque écriture."""
+
+    def __init__(self, repository, latency):
+        self.repository = repository
+        self.latency = latency
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.repository, name)
+
+        def slow(*args, **kwargs):
+            self.calls += 1
+            time.sleep(self.latency)
+            return method(*args, **kwargs)
+        return slow
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--max-call-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    rows = list(synthetic_rows(args.count, tracker.categories))
+    with tempfile.TemporaryDirectory() as directory:
+        repository = tracker.CsvRepository(os.path.join(directory, "depenses.csv"),
+                                           os.path.join(directory, "revenu.csv"))
+        slow = SlowRepository(repository, args.latency)
+        worker = PersistenceWorker(slow)
+        manager = tracker.ExpenseManager()
+
+        # Rafales façon interface: ajouts, suppressions, changements de catégorie, revenu.
+        calls = []
+        for index, row in enumerate(rows):
+            manager.add_expense(tracker.expense_from_row(row))
+            start = time.perf_counter()
+            worker.add(row)
+            if index % 10 == 9:
+                doomed = rows[index - 3][0]
+                manager.remove_expense(doomed)
+                worker.remove(doomed)
+            if index % 50 == 49:
+                changed = manager.recategorize([rows[index - 1][0]], "Santé")
+                worker.replace_many([manager.get_expense(id).to_row() for id in changed])
+                worker.write_income(f"{index:.2f}")
+            calls.append(time.perf_counter() - start)
+            if index % 200 == 199:
+                time.sleep(persistence.COALESCE_DELAY * 2)
+
+        start = time.perf_counter()
+        closed = worker.close(timeout=60)
+        closing = time.perf_counter() - start
+
+        stored = sorted(map(tuple, repository.load()))
+        expected = sorted(tuple(expense.to_row()) for expense in manager)
+        income = repository.read_income()
+
+    worst = max(calls) * 1000
+    print(f"  {len(calls)} mises en file, pire appel {worst:.3f} ms, moyenne {sum(calls) / len(calls) * 1e6:.1f} µs")
+    print(f"  {worker.status().flushes} vidages, {slow.calls} appels au stockage ({args.latency * 1000:.0f} ms chacun)")
+    print(f"  close(): {closing * 1000:.0f} ms, {'tout écrit' if closed else 'ÉCHEC'}")
+    ok = closed and stored == expected and income == f"{(len(rows) // 50) * 50 - 1:.2f}" and worst <= args.max_call_ms
+    print("  OK" if ok else "  ÉCHEC: stockage divergent ou thread appelant bloqué")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
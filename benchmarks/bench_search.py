@@ -0,0 +1,90 @@
+"""Recherche dans les descriptions (index inversé) et filtres, comme pendant la
+frappe dans la barre de recherche: chaque préfixe du mot tapé est une requête."""
+import random
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from common import DESCRIPTIONS
+
+import expense_tracker as tracker
+from expense_tracker.search import build_postings
+
+# Taille des paquets du chargement en arrière-plan (BinaryLedger.iter_columns).
+CHUNK = 50_000
+
+# Vocabulaire plus varié que DESCRIPTIONS: marchands numérotés, mots accentués.
+WORDS = [description for description in DESCRIPTIONS if description] + [
+    "Café", "Boulangerie", "Essence", "Loyer", "Électricité", "Abonnement", "Marché", "Train", "Taxi"]
+
+
+def filled(count, seed=0):
+    rng = random.Random(seed)
+    descriptions = [f"{rng.choice(WORDS)} {rng.choice(WORDS).lower()} n°{rng.randrange(5000)}"
+                    for _ in range(count)]
+    generator = np.random.default_rng(seed)
+    manager = tracker.ExpenseManager()
+    manager.add_columns([str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)],
+                        generator.integers(737425, 737425 + 5 * 365, count),
+                        generator.integers(0, len(tracker.categories), count),
+                        generator.integers(50, 50_000, count),
+                        descriptions)
+    return manager
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def loaded(manager):
+    # Rechargement comme l'interface: tokenisation sur le thread de chargement,
+    # ajout à l'index (seule part sur la boucle Tk) mesuré à part.
+    ids, ordinals, codes, cents, descriptions = manager.ids(), *manager.columns(), manager.descriptions()
+    copy = tracker.ExpenseManager()
+    copy.index_descriptions()
+    background = foreground = 0.0
+    for start in range(0, len(ids), CHUNK):
+        chunk = slice(start, start + CHUNK)
+        seconds, postings = timed(build_postings, descriptions[chunk])
+        background += seconds
+        seconds, _ = timed(copy.add_columns, ids[chunk], ordinals[chunk], codes[chunk], cents[chunk],
+                           descriptions[chunk], postings=postings)
+        foreground += seconds
+    return copy, background, foreground
+
+
+def main(count):
+    manager = filled(count)
+    print(f"{count} dépenses")
+    seconds, _ = timed(manager.search, "café")
+    print(f"  construction de l'index        {seconds * 1000:10.1f} ms")
+    manager, background, foreground = loaded(manager)
+    print(f"  chargement: tokenisation       {background * 1000:10.1f} ms  (thread de chargement)")
+    print(f"  chargement: add_columns        {foreground * 1000:10.1f} ms  (boucle Tk, index compris)")
+    queries = [("frappe 'é'", "é", {}), ("frappe 'él'", "él", {}), ("frappe 'électricité'", "électricité", {}),
+               ("deux mots", "cafe marche", {}), ("mot + catégorie", "taxi", {"category": "Transport"}),
+               ("montants", "", {"min_amount": 10, "max_amount": 20}),
+               ("dates + mot", "loyer", {"start": "2021-01-01", "end": "2021-12-31"}),
+               ("numéro exact", "n°42", {}), ("aucun résultat", "zzz", {})]
+    worst = 0
+    for label, text, filters in queries:
+        best = min(timed(manager.search, text, **filters)[0] for _ in range(5))
+        found = len(manager.search(text, **filters))
+        worst = max(worst, best)
+        print(f"  {label:<30} {best * 1000:10.2f} ms  {found:>9} résultats")
+    seconds, _ = timed(manager.add_expense, tracker.Expense(12.5, "Alimentation", "2024-05-01", str(uuid.uuid4()),
+                                                            description="Café crème"))
+    print(f"  ajout avec index à jour        {seconds * 1000:10.3f} ms")
+    print(f"  pire requête                   {worst * 1000:10.2f} ms")
+    seconds, _ = timed(manager.remove_expenses, manager.ids()[::2])
+    print(f"  suppression de la moitié       {seconds * 1000:10.1f} ms  (compactage, index renuméroté)")
+    seconds, found = timed(manager.search, "café")
+    print(f"  recherche après compactage     {seconds * 1000:10.2f} ms  {len(found):>9} résultats")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,36 @@
+"""Temps de démarrage: import du backend et lancement de la ligne de commande.
+
+Chaque mesure lance un nouvel interpréteur; la médiane de plusieurs essais
+est affichée, à comparer avec un interpréteur vide."""
+import statistics
+import subprocess
+import sys
+import time
+
+from common import ROOT
+
+COMMANDS = [
+    ("python vide", ["-c", "pass"]),
+    ("import expense_tracker", ["-c", "import expense_tracker"]),
+    ("import aggregation", ["-c", "import expense_tracker.aggregation"]),
+    ("CLI --help", ["-m", "expense_tracker", "--help"]),
+    ("import tkinter + tkcalendar", ["-c", "import tkinter, tkcalendar"]),
+]
+
+
+def median_seconds(args, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(runs):
+    for name, args in COMMANDS:
+        print(f"  {name:<28} {median_seconds(args, runs) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 15)
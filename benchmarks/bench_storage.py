@@ -0,0 +1,67 @@
+"""Compare les stockages CSV (journal), SQLite et registre binaire: ajouts, suppressions et agrégats."""
+import os
+import sys
+import tempfile
+import time
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.ledger import BinaryRepository
+
+
+def timed(action, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(repository, rows, deletions, queries):
+    manager = tracker.ExpenseManager(repository)
+    results = {}
+
+    start = time.perf_counter()
+    for row in rows:
+        repository.add(row)
+        manager.add_expense(tracker.Expense(float(row[3]), row[2], row[1], row[0], row[4]))
+    results["ajouts"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows[:deletions]:
+        repository.remove(row[0])
+        manager.remove_expense(row[0])
+    results["suppressions"] = time.perf_counter() - start
+
+    days = [row[1] for row in rows[deletions:deletions + queries]]
+    results["total quotidien"] = timed(lambda: [manager.daily_total(day) for day in days]) / queries
+    results["total mensuel"] = timed(lambda: [manager.monthly_total(int(day[:4]), int(day[5:7])) for day in days]) / queries
+    results["catégories (mois)"] = timed(
+        lambda: [manager.category_totals(*tracker.month_range(int(day[:4]), int(day[5:7]))) for day in days]) / queries
+    results["chargement"] = timed(repository.load)
+    results["load_manager"] = timed(lambda: tracker.load_manager(repository))
+    return results
+
+
+def main(count):
+    rows = list(synthetic_rows(count, tracker.categories))
+    deletions = count // 10
+    queries = 100
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            "csv": tracker.CsvRepository(os.path.join(directory, "depenses.csv"),
+                                         os.path.join(directory, "revenu.csv")),
+            "sqlite": tracker.SqliteRepository(os.path.join(directory, "depenses.db")),
+            "binaire": BinaryRepository(os.path.join(directory, "depenses.bin"), os.path.join(directory, "revenu.csv")),
+        }
+        print(f"{count} ajouts, {deletions} suppressions, {queries} requêtes par agrégat")
+        for name, repository in backends.items():
+            results = run(repository, rows, deletions, queries)
+            repository.close()
+            print(f"  {name}")
+            for label, seconds in results.items():
+                print(f"    {label:<20} {seconds * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
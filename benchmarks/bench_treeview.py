@@ -0,0 +1,50 @@
+"""Temps jusqu'au premier affichage: Treeview complet contre VirtualTreeview.
+
+Nécessite un affichage (Tk)."""
+import sys
+import time
+from tkinter import Tk, Scrollbar, VERTICAL
+from tkinter.ttk import Treeview
+
+from common import load_tracker, synthetic_rows
+
+from expense_tracker import Expense, categories
+from expense_tracker.models import ExpenseManager
+
+COLUMNS = ("Date", "Catégorie", "Montant", "Description")
+
+
+def first_paint(manager, virtual, gui):
+    root = Tk()
+    tree = Treeview(root, columns=COLUMNS, show="headings", selectmode="browse")
+    tree.grid(row=0, column=0, sticky="nsew")
+    scrollbar = Scrollbar(root, orient=VERTICAL)
+    scrollbar.grid(row=0, column=1, sticky="ns")
+    start = time.perf_counter()
+    if virtual:
+        gui.VirtualTreeview(tree, scrollbar, manager).set_ids(manager.ids())
+    else:
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.configure(command=tree.yview)
+        for expense in manager:
+            tree.insert("", "end", iid=expense.id, values=(expense.date, expense.category,
+                                                           f"{expense.amount:.2f}", expense.description))
+    root.update()
+    elapsed = time.perf_counter() - start
+    root.destroy()
+    return elapsed
+
+
+def main(sizes):
+    gui = load_tracker()
+    for count in sizes:
+        manager = ExpenseManager()
+        for exp_id, date_str, category, amount, description in synthetic_rows(count, categories):
+            manager.add_expense(Expense(float(amount), category, date_str, exp_id, description))
+        full = first_paint(manager, False, gui)
+        virtual = first_paint(manager, True, gui)
+        print(f"{count:>9} dépenses  complet {full:8.3f} s  virtuel {virtual:8.3f} s")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
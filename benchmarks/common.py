@@ -0,0 +1,34 @@
+import importlib.util
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "daily expense tracker.py")
+
+sys.path.insert(0, ROOT)
+
+DESCRIPTIONS = ["Courses", "Bus", "Facture", "Pharmacie", "Cinéma", "Livres", "Restaurant", ""]
+
+
+def load_tracker():
+    # Script de l'interface (VirtualTreeview, ExpenseApp), sous un autre nom que
+    # le paquet expense_tracker qu'il importe.
+    spec = importlib.util.spec_from_file_location("daily_expense_tracker", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_rows(count, categories, seed=0):
+    # Lignes au format de save_expenses: [ID, Date, Catégorie, Montant, Description].
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    for _ in range(count):
+        yield [str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+               (start + timedelta(days=rng.randrange(5 * 365))).isoformat(),
+               rng.choice(categories),
+               f"{rng.uniform(0.5, 500):.2f}",
+               rng.choice(DESCRIPTIONS)]
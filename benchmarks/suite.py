@@ -0,0 +1,148 @@
+"""Suite de benchmarks du backend et garde-fou contre les régressions.
+
+    python benchmarks/suite.py --update                 # enregistre la référence
+    python benchmarks/suite.py                          # compare à la référence
+    python benchmarks/suite.py --sizes 1000,1000000 --threshold 0.10
+
+Chaque cas est chronométré (meilleur de --repeat essais) puis rejoué une fois
+sous tracemalloc pour son pic mémoire. Le code de sortie vaut 1 si un temps ou
+un pic dépasse la référence de plus de --threshold.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import synthetic_rows
+
+import expense_tracker as tracker
+from expense_tracker.export import export_expenses
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# En dessous de ces écarts absolus, une variation relative est considérée comme du bruit.
+MIN_SECONDS = 0.005
+MIN_PEAK_MB = 0.5
+
+
+def build_manager(expenses):
+    manager = tracker.ExpenseManager()
+    for expense in expenses:
+        manager.add_expense(expense)
+    return manager
+
+
+def cases(rows, directory, export_max):
+    repository = tracker.CsvRepository(os.path.join(directory, "depenses.csv"),
+                                       os.path.join(directory, "revenu.csv"))
+    expenses = [tracker.Expense(float(amount), category, date_str, exp_id, description)
+                for exp_id, date_str, category, amount, description in rows]
+    filled = build_manager(expenses)
+    rng = random.Random(1)
+    days = [row[1] for row in rng.sample(rows, min(100, len(rows)))]
+    months = sorted({(int(day[:4]), int(day[5:7])) for day in days})
+    removed = [row[0] for row in rows[:max(1, len(rows) // 10)]]
+
+    yield "save_expenses", None, lambda _: repository.save(rows)
+    yield "load_expenses", None, lambda _: repository.load()
+    yield "add_expense", None, lambda _: build_manager(expenses)
+    yield "remove_expense", lambda: build_manager(expenses), lambda manager: [
+        manager.remove_expense(exp_id) for exp_id in removed]
+    yield "daily_total", None, lambda _: [filled.daily_total(day) for day in days]
+    yield "monthly_total", None, lambda _: [filled.monthly_total(year, month) for year, month in months]
+    monthly_statistics = lambda _: [filled.category_totals(*tracker.month_range(year, month))
+                                    for year, month in months]
+    yield "category_totals", filled.cache_clear, monthly_statistics
+    yield "category_totals_cached", None, monthly_statistics
+    first, last = min(row[1] for row in rows), max(row[1] for row in rows)
+    yield "range_analytics", filled.spending_index, lambda index: (
+        index.buckets(first, last, "week"), index.rolling_average(first, last, 30), index.category_trends(first, last))
+    if len(rows) <= export_max:
+        yield "export_xlsx", None, lambda _: export_expenses(filled, os.path.join(directory, "export.xlsx"))
+
+
+def measure(setup, run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+    state = setup() if setup else None
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": best, "peak_mb": peak / 2**20}
+
+
+def run_suite(sizes, repeat, export_max):
+    results = {}
+    for size in sizes:
+        rows = list(synthetic_rows(size, tracker.categories))
+        with tempfile.TemporaryDirectory() as directory:
+            for name, setup, run in cases(rows, directory, export_max):
+                key = f"{name}@{size}"
+                results[key] = measure(setup, run, repeat)
+                print(f"  {key:<28} {results[key]['seconds'] * 1000:12.2f} ms  {results[key]['peak_mb']:9.1f} Mo",
+                      flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, minimum in (("seconds", MIN_SECONDS), ("peak_mb", MIN_PEAK_MB)):
+            before, after = reference[metric], current[metric]
+            if after - before > minimum and after > before * (1 + threshold):
+                regressions.append(f"{key} {metric}: {before:.4g} -> {after:.4g} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        type=lambda value: [int(size) for size in value.split(",")],
+                        help="tailles des registres synthétiques (jusqu'à 1000000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--export-max", type=int, default=100_000,
+                        help="taille maximale pour le cas export_xlsx")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="régression tolérée, en fraction de la référence")
+    parser.add_argument("--update", action="store_true", help="remplacer la référence par ces résultats")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.repeat, args.export_max)
+
+    if args.update or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, file, indent=2, sort_keys=True)
+        print(f"Référence enregistrée dans {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"RÉGRESSION {regression}")
+    if regressions:
+        return 1
+    print(f"Aucune régression au-delà de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
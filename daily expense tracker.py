@@ -1,98 +1,238 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from tkinter import *
 from tkinter.ttk import Treeview, Style, Combobox
 from tkinter import messagebox, Toplevel
 from tkcalendar import DateEntry
 import uuid
-import csv
-import os
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
+import queue
+import threading
 from tkinter import filedialog
+import math
 
-# ----------------------------backend---------------------------------------------
-
-FILENAME = "depenses.csv"
-
-categories = ["Alimentation", "Transport", "Eau et électricité", "Santé", "Loisirs", "Éducation"]
-
-class Expense:
-    def __init__(self, amount, category, date, id, description):
-        if amount <= 0:
-            raise ValueError("Le montant doit être positif")
-        if category not in categories:
-            raise ValueError("Catégorie non trouvée")
-        self.amount = amount
-        self.category = category
-        self.date = date
-        self.id = id
-        self.description = description
-
-    def to_dict(self):
-        return {
-            "amount": self.amount,
-            "category": self.category,
-            "date": self.date,
-            "id": self.id,
-            "description": self.description
-        }
-
-class ExpenseManager:
-    def __init__(self):
-        self.expenses = []
-
-    def add_expense(self, expense):
-        if not isinstance(expense, Expense):
-            raise TypeError("Objet Expense attendu")
-        for existing_expense in self.expenses:
-            if existing_expense.id == expense.id:
-                raise ValueError("ID dupliqué")
-        self.expenses.append(expense)
-
-    def remove_expense(self, id):
-        for searched_expense in self.expenses:
-            if searched_expense.id == id:
-                self.expenses.remove(searched_expense)
-                return
-        raise ValueError("Dépense non trouvée")
-
-    def daily_total(self, given_date):
-        total = 0
-        for expense in self.expenses:
-            expense_date = datetime.strptime(expense.date, "%Y-%m-%d")
-            given_date_dt = datetime.strptime(given_date, "%Y-%m-%d")
-            if expense_date.date() == given_date_dt.date():
-                total += expense.amount
-        return total
-
-    def monthly_total(self, year, month):
-        total = 0
-        for expense in self.expenses:
-            expense_date = datetime.strptime(expense.date, "%Y-%m-%d")
-            if expense_date.year == year and expense_date.month == month:
-                total += expense.amount
-        return total
-
-def save_expenses(data):
-    with open(FILENAME, "w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["ID", "Date", "Catégorie", "Montant", "Description"])
-        writer.writerows(data)
-
-def load_expenses():
-    if not os.path.exists(FILENAME):
-        return []
-    with open(FILENAME, "r", encoding="utf-8") as file:
-        reader = csv.reader(file)
-        next(reader, None)
-        rows = [row for row in reader if row and len(row) >= 5]
-    return rows
-
+from expense_tracker import Expense, categories, expense_columns, expense_from_row, month_range
+from expense_tracker import instrumentation
+from expense_tracker.instrumentation import timed
+from expense_tracker.ledgers import DEFAULT_LEDGER, LedgerSet, consolidate
+from expense_tracker.export import EXPORT_FORMATS, ExportCancelled, export_expenses
+from expense_tracker.search import build_postings
 
 # ------------------- frontend ---------------------------------------------
+
+# Bits de event.state des touches Maj et Ctrl.
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
+# Intervalle (ms) de réception des paquets chargés en arrière-plan.
+LOAD_POLL_MS = 50
+# Lignes d'un registre binaire listées (ID formatés, descriptions tokenisées) par paquet.
+LIST_CHUNK = 50_000
+
+# Délai (ms) avant d'écrire le revenu modifié.
+REVENU_SAVE_DELAY_MS = 1000
+
+# Délai (ms) après la dernière frappe dans la barre de recherche avant de filtrer.
+SEARCH_DELAY_MS = 150
+
+# Intervalle (ms) de rafraîchissement du panneau de performances.
+PERF_REFRESH_MS = 1000
+
+# Intervalle (ms) de lecture de l'état des écritures en arrière-plan.
+PERSISTENCE_POLL_MS = 250
+# Attente maximale (s) des écritures en attente à la fermeture, avant de proposer de réessayer.
+PERSISTENCE_CLOSE_TIMEOUT = 10
+
+# Intervalle (ms) de libération des registres inactifs (voir ledgers.IDLE_TIMEOUT).
+LEDGER_EVICT_MS = 60_000
+
+ANALYTICS_VIEWS = ["Totaux par période", "Dépense cumulée", "Moyenne glissante 7 jours",
+                   "Moyenne glissante 30 jours", "Tendances par catégorie"]
+ANALYTICS_GRANULARITIES = [("Semaine", "week"), ("Mois", "month"), ("Année", "year")]
+CHART_COLORS = ["#4e79a7", "#f28e2b", "#59a14f", "#e15759", "#76b7b2", "#b07aa1"]
+
+
+def draw_chart(canvas, labels, series, bars=False):
+    """Trace `series` (nom -> valeurs alignées sur `labels`) en barres ou en courbes."""
+    canvas.delete("all")
+    width, height = int(canvas.cget("width")), int(canvas.cget("height"))
+    left, top = 80, 20
+    plot_width, plot_height = width - left - 20, height - top - 50
+    values = [value for values in series.values() for value in values]
+    if not labels or not values:
+        canvas.create_text(width / 2, height / 2, text="Aucune donnée", font=("Segoe UI", 14))
+        return
+
+    peak = max(values) or 1
+
+    def y(value):
+        return top + plot_height * (1 - value / peak)
+
+    for step in range(5):
+        value = peak * step / 4
+        canvas.create_line(left, y(value), left + plot_width, y(value), fill="#e0e0e0")
+        canvas.create_text(left - 8, y(value), text=f"{value:.2f}", anchor="e", font=("Segoe UI", 9))
+    canvas.create_line(left, top, left, top + plot_height)
+    canvas.create_line(left, top + plot_height, left + plot_width, top + plot_height)
+
+    slot = plot_width / len(labels)
+    every = max(1, len(labels) // 10)
+    for i in range(0, len(labels), every):
+        canvas.create_text(left + (i + 0.5) * slot, top + plot_height + 15, text=labels[i], font=("Segoe UI", 9))
+
+    for index, (name, values) in enumerate(series.items()):
+        color = CHART_COLORS[index % len(CHART_COLORS)]
+        if bars:
+            bar = slot * 0.8 / len(series)
+            for i, value in enumerate(values):
+                x = left + i * slot + slot * 0.1 + index * bar
+                canvas.create_rectangle(x, y(value), x + bar, y(0), fill=color, width=0)
+        elif len(values) > 1:
+            points = [coordinate for i, value in enumerate(values) for coordinate in (left + (i + 0.5) * slot, y(value))]
+            canvas.create_line(*points, fill=color, width=2)
+        else:
+            canvas.create_oval(left + slot / 2 - 3, y(values[0]) - 3, left + slot / 2 + 3, y(values[0]) + 3, fill=color)
+        if len(series) > 1:
+            canvas.create_text(left + 10, top + 5 + 15 * index, text=name, fill=color, anchor="nw",
+                               font=("Segoe UI", 10, "bold"))
+
+class VirtualTreeview:
+    """Treeview virtuel: seules les lignes visibles sont insérées dans le widget,
+    les autres sont lues dans l'ExpenseManager au fil du défilement."""
+
+    def __init__(self, tree, scrollbar, manager):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.manager = manager
+        self._ids = []
+        self._window = []
+        self._selected = []
+        # Dernier clic ou flèche pas encore suivi de <<TreeviewSelect>>: "plain"
+        # (remplace la sélection) ou "extend" (Ctrl/Maj, complète la sélection).
+        self._gesture = None
+        self._offset = 0
+        self._visible = int(tree.cget("height"))
+
+        tree.configure(yscrollcommand="")
+        scrollbar.configure(command=self._on_scroll)
+        tree.bind("<Configure>", self._on_resize, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<ButtonPress-1>", self._on_press, add="+")
+        tree.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1))
+        tree.bind("<Button-4>", lambda e: self._scroll_by(-1))
+        tree.bind("<Button-5>", lambda e: self._scroll_by(1))
+        tree.bind("<Up>", lambda e: self._on_arrow(-1, e))
+        tree.bind("<Down>", lambda e: self._on_arrow(1, e))
+
+    def set_ids(self, ids):
+        self._ids = list(ids)
+        self._selected = []
+        self._scroll_to(0)
+
+    def append(self, id):
+        self.extend([id])
+
+    def extend(self, ids):
+        self._ids.extend(ids)
+        self.refresh()
+
+    def delete(self, id):
+        self.delete_many([id])
+
+    def delete_many(self, ids):
+        # Une seule passe sur la liste et un seul rafraîchissement du widget.
+        doomed = set(ids)
+        self._ids = [id for id in self._ids if id not in doomed]
+        self._selected = [id for id in self._selected if id not in doomed]
+        self._scroll_to(self._offset)
+
+    def selection(self):
+        return tuple(self._selected)
+
+    @timed("treeview.refresh")
+    def refresh(self):
+        self.tree.delete(*self._window)
+        self._window = self._ids[self._offset:self._offset + self._visible]
+        for id in self._window:
+            expense = self.manager.get_expense(id)
+            self.tree.insert("", "end", iid=id, values=(expense.date, expense.category,
+                                                        f"{expense.amount:.2f}", expense.description))
+        shown = set(self._window)
+        self.tree.selection_set([id for id in self._selected if id in shown])
+        if self._ids:
+            self.scrollbar.set(self._offset / len(self._ids),
+                               min(1.0, (self._offset + self._visible) / len(self._ids)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, offset):
+        self._offset = max(0, min(offset, len(self._ids) - self._visible))
+        self.refresh()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self._offset + rows)
+        return "break"
+
+    def _on_scroll(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(value) * len(self._ids)))
+        elif action == "scroll":
+            step = self._visible if unit == "pages" else 1
+            self._scroll_by(int(value) * step)
+
+    def _on_resize(self, event):
+        row_height = int(Style().lookup("Treeview", "rowheight") or 20)
+        # Une ligne est réservée aux en-têtes.
+        visible = max(1, event.height // row_height - 1)
+        if visible != self._visible:
+            self._visible = visible
+            self._scroll_to(self._offset)
+
+    @staticmethod
+    def _gesture_of(event):
+        return "extend" if event.state & (SHIFT_MASK | CONTROL_MASK) else "plain"
+
+    def _on_press(self, event):
+        # Un clic hors des lignes (en-têtes, zone vide) ne change pas la sélection.
+        if self.tree.identify_row(event.y):
+            self._gesture = self._gesture_of(event)
+
+    def _on_select(self, event):
+        # Seule la fenêtre affichée reflète le widget. Un clic simple remplace
+        # toute la sélection; avec Ctrl ou Maj, ou après un rafraîchissement
+        # (défilement), la sélection hors fenêtre est conservée.
+        gesture, self._gesture = self._gesture, None
+        current = list(self.tree.selection())
+        if gesture == "plain" or current and str(self.tree.cget("selectmode")) == "browse":
+            self._selected = current
+            return
+        shown = set(self._window)
+        self._selected = [id for id in self._selected if id not in shown] + current
+
+    def _on_arrow(self, step, event):
+        self._gesture = self._gesture_of(event)
+        focus = self.tree.focus()
+        if not self._window or focus != self._window[0 if step < 0 else -1]:
+            return None
+        index = self._ids.index(focus, self._offset) + step
+        if not 0 <= index < len(self._ids):
+            return None
+        self._selected = [self._ids[index]]
+        self._scroll_by(step)
+        self.tree.focus(self._ids[index])
+        return "break"
+
+
 class ExpenseApp:
     def __init__(self):
-        self.manager = ExpenseManager()
+        # Un registre ouvert à la fois dans la fenêtre; les autres restent en
+        # mémoire jusqu'à leur libération pour inactivité. Toutes les écritures
+        # passent par le thread de persistance du registre; le stockage peut
+        # donc être en retard sur le manager, qui calcule seul les totaux.
+        self.ledgers = LedgerSet()
+        # Registres dont l'historique est en cours de chargement -> nombre de
+        # lignes projetées (registre binaire) déjà listées, None pour les autres.
+        # Clé: l'objet Ledger, un registre libéré puis rouvert repart de zéro.
+        self._loading = {}
+        self._use_ledger(self.ledgers.open(DEFAULT_LEDGER, load=False))
         self.root = Tk()
         self.root.title("Suivi des Dépenses Quotidiennes")
         self.root.state("zoomed")
@@ -129,6 +269,8 @@ class ExpenseApp:
         Label(inputs_frame, text="Revenu", font=("Segoe UI", 12, "bold"), bg="lightgrey").grid(row=0, column=0, padx=10,
                                                                                            pady=5, sticky="w")
         self.revenu_var = StringVar()
+        self._saved_revenu = None
+        self._revenu_save_job = None
         self.revenu_entry = Entry(inputs_frame, font=entry_font, textvariable=self.revenu_var)
         self.revenu_entry.grid(row=0, column=1, padx=10, pady=5, sticky="ew", ipady=5)
 
@@ -189,38 +331,60 @@ class ExpenseApp:
         self.root.grid_rowconfigure(2, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
 
+        # Barre de recherche: chaque champ rempli restreint la liste; elle est
+        # refiltrée SEARCH_DELAY_MS après la dernière modification.
+        search_frame = Frame(tree_frame)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        self._search_job = None
+        self._filtered = False
+        self.search_vars = {}
+        column = 0
+        for text, name, width in (("Rechercher", "text", 24), ("Montant min", "min_amount", 8),
+                                  ("max", "max_amount", 8), ("Du", "start", 11), ("Au", "end", 11)):
+            Label(search_frame, text=text, font=label_font).grid(row=0, column=column, padx=(10, 5))
+            self.search_vars[name] = StringVar()
+            self.search_vars[name].trace_add("write", lambda *args: self._schedule_search())
+            Entry(search_frame, textvariable=self.search_vars[name], font=entry_font,
+                  width=width).grid(row=0, column=column + 1, ipady=3)
+            column += 2
+        Label(search_frame, text="Catégorie", font=label_font).grid(row=0, column=column, padx=(10, 5))
+        self.search_category = Combobox(search_frame, values=["Toutes", *categories], font=entry_font,
+                                        state="readonly", width=16)
+        self.search_category.current(0)
+        self.search_category.bind("<<ComboboxSelected>>", lambda e: self._schedule_search())
+        self.search_category.grid(row=0, column=column + 1)
+        Button(search_frame, text="Effacer", font=label_font,
+               command=self.clear_search).grid(row=0, column=column + 2, padx=10)
+        self.search_count_var = StringVar()
+        Label(search_frame, textvariable=self.search_count_var,
+              font=("Segoe UI", 10)).grid(row=0, column=column + 3, padx=5, sticky="w")
+
 
         self.treeview = Treeview(tree_frame, columns=("Date", "Catégorie", "Montant", "Description"),
-                                 show="headings", selectmode="browse")
+                                 show="headings", selectmode="extended")
         for col in ("Date", "Catégorie", "Montant", "Description"):
             self.treeview.heading(col, text=col, anchor="center")
             self.treeview.column(col, anchor="center", width=200, stretch=True, minwidth=100)
-        self.treeview.grid(row=0, column=0, sticky="nsew")
+        self.treeview.grid(row=1, column=0, sticky="nsew")
 
 
-        scrollbar_y = Scrollbar(tree_frame, orient=VERTICAL, command=self.treeview.yview)
-        scrollbar_y.grid(row=0, column=1, sticky="ns", padx=10)
-        self.treeview.configure(yscrollcommand=scrollbar_y.set)
+        scrollbar_y = Scrollbar(tree_frame, orient=VERTICAL)
+        scrollbar_y.grid(row=1, column=1, sticky="ns", padx=10)
+        self.expense_list = VirtualTreeview(self.treeview, scrollbar_y, self.manager)
 
 
-        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(1, weight=1)
         tree_frame.grid_columnconfigure(0, weight=1)
 
-        rows = load_expenses()
-        self.manager.expenses = []
+        self.loading_var = StringVar()
+        Label(tree_frame, textvariable=self.loading_var, font=("Segoe UI", 10)).grid(row=2, column=0, sticky="w")
+        self.persistence_var = StringVar()
+        self.persistence_label = Label(tree_frame, textvariable=self.persistence_var, font=("Segoe UI", 10))
+        self.persistence_label.grid(row=2, column=0, sticky="e")
+        self.root.after(PERSISTENCE_POLL_MS, self._show_persistence_status)
 
-        for row in rows:
-            if not row:
-                continue
-            exp_id, date_str, category, amount_str, description = row
-            try:
-                amount_float = float(amount_str)
-            except:
-                amount_float = 0.0
-            expense = Expense(amount_float, category, date_str, exp_id, description)
-            self.manager.add_expense(expense)
-            self.treeview.insert("", "end", iid=exp_id,
-                                 values=(date_str, category, f"{amount_float:.2f}", description))
+        self._start_loading()
+        self.root.after(LEDGER_EVICT_MS, self._evict_idle_ledgers)
 
 
         self.load_revenu()
@@ -234,6 +398,21 @@ class ExpenseApp:
 
         Button(btn_frame, text="Supprimer sélection", font=("Segoe UI", 12),
                command=self.delete_expense).grid(row=0, column=0, padx=15, pady=(5, 20), sticky="w")
+        Button(btn_frame, text="Changer catégorie", font=("Segoe UI", 12),
+               command=self.change_category).grid(row=1, column=0, padx=15, pady=(0, 20), sticky="w")
+
+        ledger_frame = Frame(btn_frame, bg="white")
+        ledger_frame.grid(row=1, column=1, columnspan=5, sticky="w", pady=(0, 20))
+        Label(ledger_frame, text="Registre:", font=("Segoe UI", 12, "bold"), bg="white").pack(side=LEFT, padx=(15, 5))
+        self.ledger_combobox = Combobox(ledger_frame, values=self.ledgers.names(), font=("Segoe UI", 12),
+                                        state="readonly", width=18)
+        self.ledger_combobox.set(self.ledger.name)
+        self.ledger_combobox.bind("<<ComboboxSelected>>", lambda e: self.switch_ledger(self.ledger_combobox.get()))
+        self.ledger_combobox.pack(side=LEFT, padx=5)
+        Button(ledger_frame, text="Nouveau registre", font=("Segoe UI", 12),
+               command=self.create_ledger).pack(side=LEFT, padx=10)
+        Button(ledger_frame, text="Vue consolidée", font=("Segoe UI", 12),
+               command=self.consolidated_view).pack(side=LEFT, padx=10)
         Button(btn_frame, text="Total Quotidien", font=("Segoe UI", 12),
                command=self.daily_total).grid(row=0, column=1, padx=15, pady=(5, 20), sticky="w")
         Button(btn_frame, text="Total Mensuel", font=("Segoe UI", 12),
@@ -251,9 +430,15 @@ class ExpenseApp:
         Button(stats_frame, text="Statistiques mensuelles", font=("Segoe UI", 12),
                command=self.monthly_statistics).pack(side=RIGHT, padx=10, pady=(5, 20))
 
+        Button(stats_frame, text="Analyses", font=("Segoe UI", 12),
+               command=self.analytics).pack(side=RIGHT, padx=10, pady=(5, 20))
+
         Button(btn_frame, text="Export to Excel", font=("Segoe UI", 12),
                command=self.export_to_excel).grid(row=0, column=6, padx=10, pady=(5, 20), sticky="e")
 
+        Button(btn_frame, text="Performances", font=("Segoe UI", 12),
+               command=self.performance_panel).grid(row=0, column=7, padx=10, pady=(5, 20), sticky="e")
+
         def resize_columns(event):
             tree_width = self.treeview.winfo_width()
             num_cols = len(self.treeview["columns"])
@@ -264,6 +449,237 @@ class ExpenseApp:
 
         self.root.mainloop()
 
+    def _use_ledger(self, ledger):
+        self.ledger = ledger
+        self.repository = ledger.repository
+        self.manager = ledger.manager
+        self.persistence = ledger.persistence
+
+    def _start_loading(self):
+        # L'historique est lu, analysé et tokenisé pour la recherche par paquets
+        # sur un thread, puis ajouté au manager depuis la boucle Tk: la fenêtre
+        # reste utilisable pendant ce temps.
+        if self.ledger.complete or self.ledger in self._loading:
+            return
+        batches = queue.Queue()
+        if self.repository.supports_columns:
+            # Registre binaire: ses colonnes projetées sont celles du manager et
+            # les totaux sont justes tout de suite; seuls les ID à lister et
+            # l'index de recherche arrivent ensuite par paquets.
+            base = self.repository.mapped()
+            self.manager.attach(base)
+            self.manager.index_descriptions(base=False)
+            self.ledger.complete = True
+            self._loading[self.ledger] = 0
+            target, source = self._list_in_background, base
+            self.update_total()
+        else:
+            self.manager.index_descriptions()
+            self._loading[self.ledger] = None
+            target, source = self._load_in_background, self.repository
+        threading.Thread(target=target, args=(source, batches), daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self._receive_loaded, self.ledger, batches)
+
+    def _list_in_background(self, base, batches):
+        # Paquets (position de départ, ID formatés, postings) des lignes projetées,
+        # supprimées comprises: ExpenseManager.live_ids les écarte.
+        try:
+            for start in range(0, len(base), LIST_CHUNK):
+                stop = min(start + LIST_CHUNK, len(base))
+                batches.put((start, base.format_ids(start, stop), build_postings(base.descriptions(slice(start, stop)))))
+        finally:
+            batches.put(None)
+
+    def _load_in_background(self, repository, batches):
+        # Paquets (colonnes, postings de l'index de recherche) pour ExpenseManager.add_columns.
+        try:
+            for rows in repository.iter_chunks():
+                batch = []
+                for row in rows:
+                    try:
+                        batch.append(expense_from_row(row))
+                    except ValueError:
+                        continue
+                columns = expense_columns(batch)
+                batches.put((columns, build_postings(columns[4])))
+        finally:
+            batches.put(None)
+
+    def _receive_loaded(self, ledger, batches):
+        # Le chargement continue si l'on change de registre; seul l'affichage suit le registre courant.
+        try:
+            batch = batches.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self._receive_loaded, ledger, batches)
+            return
+        active = ledger is self.ledger
+        if batch is None:
+            ledger.complete = True
+            del self._loading[ledger]
+            if active:
+                self.loading_var.set("")
+                self.update_total()
+            return
+
+        if len(batch) == 3:
+            # Lignes projetées d'un registre binaire, déjà comptées dans le manager.
+            start, ids, postings = batch
+            ledger.manager.index_postings(start, postings)
+            added = ledger.manager.live_ids(start, ids)
+            self._loading[ledger] = start + len(ids)
+        else:
+            added = self._add_loaded(ledger, *batch)
+        if active:
+            if self._filtered:
+                self._schedule_search()
+            else:
+                self.expense_list.extend(added)
+            self.update_total()
+            listed = self._loading[ledger]
+            self.loading_var.set(f"Chargement de l'historique... {len(self.manager) if listed is None else listed} dépenses")
+        self.root.after(1, self._receive_loaded, ledger, batches)
+
+    @staticmethod
+    def _add_loaded(ledger, columns, postings):
+        # Ajoute un paquet lu dans un journal; renvoie les ID gardés.
+        added = columns[0]
+        try:
+            ledger.manager.add_columns(*columns, postings=postings)
+        except ValueError:
+            # ID en double (journal abîmé): seule la première occurrence est
+            # gardée, et ce paquet est tokenisé ici.
+            seen = set()
+            keep = [index for index, id in enumerate(added)
+                    if id not in ledger.manager and not (id in seen or seen.add(id))]
+            ids, ordinals, codes, cents, descriptions = columns
+            added = [ids[index] for index in keep]
+            ledger.manager.add_columns(added, ordinals[keep], codes[keep], cents[keep],
+                                       [descriptions[index] for index in keep])
+        return added
+
+    def switch_ledger(self, name):
+        if name == self.ledger.name:
+            return
+        self.save_revenu()
+        # Le registre quitté compte comme utilisé jusqu'ici pour sa libération.
+        self.ledger.last_used = self.ledgers.clock()
+        try:
+            ledger = self.ledgers.open(name, load=False)
+        except ValueError as e:
+            # Registre supprimé, ou encore en cours de libération (réessayer plus tard).
+            messagebox.showerror("Erreur", str(e))
+            self.ledger_combobox.set(self.ledger.name)
+            return
+        self._use_ledger(ledger)
+        self.expense_list.manager = self.manager
+        self.ledger_combobox.set(name)
+        self.loading_var.set("")
+        self.clear_search()
+        self.load_revenu()
+        self.update_total()
+        self._start_loading()
+
+    def create_ledger(self):
+        popup = Toplevel(self.root)
+        popup.title("Nouveau registre")
+        popup.geometry("400x180")
+        popup.resizable(False, False)
+
+        Label(popup, text="Nom du registre:", font=("Segoe UI", 12)).pack(pady=15)
+        name_entry = Entry(popup, font=("Segoe UI", 12))
+        name_entry.pack(pady=5)
+
+        def create():
+            try:
+                name = self.ledgers.create(name_entry.get())
+            except (ValueError, OSError) as e:
+                messagebox.showerror("Erreur", str(e), parent=popup)
+                return
+            popup.destroy()
+            self.ledger_combobox.configure(values=self.ledgers.names())
+            self.switch_ledger(name)
+
+        Button(popup, text="Créer", font=("Segoe UI", 12), width=15, command=create).pack(pady=15)
+
+    def consolidated_view(self):
+        popup = Toplevel(self.root)
+        popup.title("Vue consolidée")
+        popup.geometry("700x500")
+
+        names = self.ledgers.names()
+        progress_var = StringVar()
+        Label(popup, textvariable=progress_var, font=("Segoe UI", 10)).pack(pady=5)
+        tree = Treeview(popup, columns=("Mois", *names, "Total"), show="headings")
+        for column in ("Mois", *names, "Total"):
+            tree.heading(column, text=column)
+            tree.column(column, anchor="center", width=100)
+        tree.pack(fill=BOTH, expand=True, padx=10, pady=10)
+
+        # Les registres ouverts donnent leurs totaux depuis leur manager; les
+        # registres fermés sont lus depuis leurs résumés mensuels sur un thread,
+        # rechargés là s'ils n'en ont pas encore.
+        summaries = {}
+        reading = set()
+        stored = queue.Queue()
+
+        def read(pending):
+            for name in pending:
+                try:
+                    stored.put((name, self.ledgers.stored_summary(name)))
+                except (ValueError, OSError) as e:
+                    stored.put((name, e))
+
+        def show():
+            results = consolidate(summaries, by=("month", "ledger"))
+            months = sorted({key[0] for key, *_ in results})
+            totals = {key: total for key, total, *_ in results}
+            for month in months:
+                values = [totals.get((month, name), 0.0) for name in names]
+                tree.insert("", END, values=(month, *(f"{value:.2f}" for value in values), f"{sum(values):.2f}"))
+            grand = [sum(totals.get((month, name), 0.0) for month in months) for name in names]
+            tree.insert("", END, values=("Total", *(f"{value:.2f}" for value in grand), f"{sum(grand):.2f}"))
+
+        def receive():
+            if not popup.winfo_exists():
+                return
+            while True:
+                try:
+                    name, summary = stored.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(summary, Exception):
+                    popup.destroy()
+                    messagebox.showerror("Erreur", f"{name}: {summary}")
+                    return
+                summaries[name] = summary
+            closed = []
+            for name in names:
+                if name in summaries or name in reading:
+                    continue
+                ledger = self.ledgers.get(name)
+                if ledger is None:
+                    closed.append(name)
+                elif ledger.complete:
+                    summaries[name] = ledger.manager.monthly_summary()
+            if closed:
+                reading.update(closed)
+                threading.Thread(target=read, args=(closed,), daemon=True).start()
+            if len(summaries) < len(names):
+                progress_var.set(f"Lecture des registres... {len(summaries)}/{len(names)}")
+                self.root.after(LOAD_POLL_MS, receive)
+                return
+            progress_var.set("")
+            show()
+
+        receive()
+
+    def _evict_idle_ledgers(self):
+        # Fermeture et résumé sur un thread: la boucle Tk n'attend pas le disque.
+        for name in self.ledgers.idle(keep=(self.ledger.name,)):
+            threading.Thread(target=self.ledgers.release, args=(self.ledgers.detach(name),), daemon=True).start()
+        self.root.after(LEDGER_EVICT_MS, self._evict_idle_ledgers)
+
+    @timed("gui.add_expense")
     def add_expense(self):
         montant = self.amount_entry.get()
         date = self.date_entry.get_date()
@@ -285,33 +701,116 @@ class ExpenseApp:
         expense_id = str(uuid.uuid4())
         expense = Expense(float(montant), categorie, date.strftime("%Y-%m-%d"), expense_id, description)
         self.manager.add_expense(expense)
-        self.treeview.insert("", "end", iid=expense_id,
-                             values=(date.strftime("%Y-%m-%d"), categorie, f"{float(montant):.2f}", description))
+        if self._filtered:
+            self.apply_search()
+        else:
+            self.expense_list.append(expense_id)
         self.update_total()
+        self.persistence.add(expense.to_row())
 
-        rows = [[exp.id, exp.date, exp.category, f"{exp.amount:.2f}", exp.description] for exp in self.manager.expenses]
-        save_expenses(rows)
-
+    @timed("gui.delete_expense")
     def delete_expense(self):
-        selected_item = self.treeview.selection()
-        if not selected_item:
+        selected = self.expense_list.selection()
+        if not selected:
             messagebox.showerror("Erreur", "Sélectionnez une dépense à supprimer")
             return
-        expense_id = selected_item[0]
+        if len(selected) > 1 and not messagebox.askyesno("Confirmation", f"Supprimer {len(selected)} dépenses ?"):
+            return
         try:
-            self.manager.remove_expense(expense_id)
-            self.treeview.delete(expense_id)
-            self.update_total()
-            rows = [[exp.id, exp.date, exp.category, f"{exp.amount:.2f}", exp.description] for exp in
-                    self.manager.expenses]
-            save_expenses(rows)
+            self.manager.remove_expenses(selected)
+        except ValueError:
+            messagebox.showerror("Erreur", "Dépense non trouvée")
+            return
+        self.expense_list.delete_many(selected)
+        self.update_total()
+        self.persistence.remove_many(selected)
+
+    def change_category(self):
+        selected = self.expense_list.selection()
+        if not selected:
+            messagebox.showerror("Erreur", "Sélectionnez les dépenses à modifier")
+            return
+
+        popup = Toplevel(self.root)
+        popup.title("Changer la catégorie")
+        popup.geometry("400x200")
+        popup.resizable(False, False)
 
+        Label(popup, text=f"Nouvelle catégorie pour {len(selected)} dépense(s):", font=("Segoe UI", 12)).pack(pady=15)
+        category_cb = Combobox(popup, values=categories, font=("Segoe UI", 12), state="readonly")
+        category_cb.current(0)
+        category_cb.pack(pady=5)
 
+        @timed("gui.change_category")
+        def apply():
+            try:
+                changed = self.manager.recategorize(selected, category_cb.get())
+            except ValueError:
+                messagebox.showerror("Erreur", "Dépense non trouvée", parent=popup)
+                return
+            popup.destroy()
+            if changed:
+                if self._filtered:
+                    self.apply_search()
+                else:
+                    self.expense_list.refresh()
+                self.persistence.replace_many([self.manager.get_expense(id).to_row() for id in changed])
+
+        Button(popup, text="Appliquer", font=("Segoe UI", 12), width=15, command=apply).pack(pady=15)
+
+    def _search_filters(self):
+        # Critères remplis, au format de ExpenseManager.search; ValueError si un champ est invalide.
+        values = {name: var.get().strip() for name, var in self.search_vars.items()}
+        filters = {}
+        if values["text"]:
+            filters["text"] = values["text"]
+        for name in ("min_amount", "max_amount"):
+            if values[name]:
+                amount = float(values[name].replace(",", "."))
+                # "nan", "inf" ou un montant trop grand pour être converti en centimes.
+                if not math.isfinite(amount * 100):
+                    raise ValueError("Montant invalide")
+                filters[name] = amount
+        for name in ("start", "end"):
+            if values[name]:
+                filters[name] = datetime.strptime(values[name], "%Y-%m-%d").date()
+        if self.search_category.current() > 0:
+            filters["category"] = self.search_category.get()
+        return filters
+
+    def _schedule_search(self):
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DELAY_MS, self.apply_search)
+
+    @timed("gui.search")
+    def apply_search(self):
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
+        try:
+            filters = self._search_filters()
         except ValueError:
-            messagebox.showerror("Erreur", "Dépense non trouvée")
+            self.search_count_var.set("Montant ou date invalide (AAAA-MM-JJ)")
+            return
+        self._filtered = bool(filters)
+        if filters:
+            ids = self.manager.search(**filters)
+            self.search_count_var.set(f"{len(ids)} / {len(self.manager)} dépenses")
+        else:
+            # Registre binaire en cours de chargement: seules les lignes projetées déjà reçues.
+            ids = self.manager.ids(base_stop=self._loading.get(self.ledger))
+            self.search_count_var.set("")
+        self.expense_list.set_ids(ids)
+
+    def clear_search(self):
+        for var in self.search_vars.values():
+            var.set("")
+        self.search_category.current(0)
+        self.apply_search()
 
     def update_total(self):
-        total_depenses = sum(exp.amount for exp in self.manager.expenses)
+        total_depenses = self.manager.total()
         self.total_var.set(f"{total_depenses:.2f}")
 
         try:
@@ -365,9 +864,7 @@ class ExpenseApp:
         def calculate_total():
             month = int(month_cb.get())
             year = int(year_cb.get())
-            total = sum(exp.amount for exp in self.manager.expenses
-                        if datetime.strptime(exp.date, "%Y-%m-%d").year == year
-                        and datetime.strptime(exp.date, "%Y-%m-%d").month == month)
+            total = self.manager.monthly_total(year, month)
             total_label.config(text=f"Total: {total:.2f}")
 
         Button(popup, text="Calculer", font=("Segoe UI", 14, "bold"),
@@ -393,19 +890,15 @@ class ExpenseApp:
         total_label = Label(popup, text="Total: 0.00", font=("Segoe UI", 16, "bold"), fg="black")
         total_label.pack(pady=10)
 
+        @timed("stats.daily")
         def calculate():
             date_selected = cal.get()
-            categories_totals = {}
-            for exp in self.manager.expenses:
-                if exp.date == date_selected:
-                    categories_totals[exp.category] = categories_totals.get(exp.category, 0) + exp.amount
-
-
+            results = self.manager.category_totals(date_selected, date_selected)
             for i in tree.get_children():
                 tree.delete(i)
-            total = sum(categories_totals.values())
-            for cat, amt in categories_totals.items():
-                perc = (amt / total * 100) if total > 0 else 0
+            total = 0
+            for (cat,), amt, count, perc in results:
+                total += amt
                 tree.insert("", "end", values=(cat, f"{amt:.2f}", f"{perc:.1f}%"))
             total_label.config(text=f"Total: {total:.2f}")
 
@@ -438,21 +931,19 @@ class ExpenseApp:
         total_label = Label(popup, text="Total: 0.00", font=("Segoe UI", 16, "bold"))
         total_label.pack(pady=10)
 
+        @timed("stats.monthly")
         def calculate_statistics():
             month = int(month_cb.get())
             year = int(year_cb.get())
-            categories_totals = {}
-            for exp in self.manager.expenses:
-                exp_date = datetime.strptime(exp.date, "%Y-%m-%d")
-                if exp_date.year == year and exp_date.month == month:
-                    categories_totals[exp.category] = categories_totals.get(exp.category, 0) + exp.amount
+            start, end = month_range(year, month)
+            results = self.manager.category_totals(start, end)
 
             for i in tree.get_children():
                 tree.delete(i)
 
-            total = sum(categories_totals.values())
-            for cat, amt in categories_totals.items():
-                perc = (amt / total * 100) if total > 0 else 0
+            total = 0
+            for (cat,), amt, count, perc in results:
+                total += amt
                 tree.insert("", "end", values=(cat, f"{amt:.2f}", f"{perc:.1f}%"))
 
             total_label.config(text=f"Total: {total:.2f}")
@@ -463,20 +954,99 @@ class ExpenseApp:
 
         Button(btn_frame, text="Calculer", font=("Segoe UI", 14, "bold"), width=20, command=calculate_statistics).pack()
 
+    def analytics(self):
+        popup = Toplevel(self.root)
+        popup.title("Analyses")
+        popup.geometry("900x650")
+
+        controls = Frame(popup)
+        controls.pack(pady=10)
+        Label(controls, text="Du:", font=("Segoe UI", 12)).grid(row=0, column=0, padx=5)
+        start_entry = DateEntry(controls, date_pattern='yyyy-MM-dd', font=("Segoe UI", 12))
+        start_entry.set_date(datetime.now().date() - timedelta(days=364))
+        start_entry.grid(row=0, column=1, padx=5)
+        Label(controls, text="Au:", font=("Segoe UI", 12)).grid(row=0, column=2, padx=5)
+        end_entry = DateEntry(controls, date_pattern='yyyy-MM-dd', font=("Segoe UI", 12))
+        end_entry.grid(row=0, column=3, padx=5)
+        Label(controls, text="Période:", font=("Segoe UI", 12)).grid(row=0, column=4, padx=5)
+        granularity_cb = Combobox(controls, values=[name for name, _ in ANALYTICS_GRANULARITIES],
+                                  font=("Segoe UI", 12), state="readonly", width=10)
+        granularity_cb.current(1)
+        granularity_cb.grid(row=0, column=5, padx=5)
+
+        Label(controls, text="Vue:", font=("Segoe UI", 12)).grid(row=1, column=0, padx=5, pady=5)
+        view_cb = Combobox(controls, values=ANALYTICS_VIEWS, font=("Segoe UI", 12), state="readonly", width=26)
+        view_cb.current(0)
+        view_cb.grid(row=1, column=1, columnspan=3, padx=5, pady=5, sticky="w")
+        Label(controls, text="Catégorie:", font=("Segoe UI", 12)).grid(row=1, column=4, padx=5, pady=5)
+        category_cb = Combobox(controls, values=["Toutes", *categories], font=("Segoe UI", 12),
+                               state="readonly", width=18)
+        category_cb.current(0)
+        category_cb.grid(row=1, column=5, padx=5, pady=5)
+
+        canvas = Canvas(popup, width=860, height=420, bg="white", highlightthickness=0)
+        canvas.pack(padx=10, pady=5)
+        summary_var = StringVar()
+        Label(popup, textvariable=summary_var, font=("Segoe UI", 12, "bold")).pack(pady=5)
+
+        @timed("stats.analytics")
+        def draw():
+            start, end = start_entry.get_date(), end_entry.get_date()
+            if start > end:
+                messagebox.showerror("Erreur", "La date de début doit précéder la date de fin", parent=popup)
+                return
+            index = self.manager.spending_index()
+            granularity = ANALYTICS_GRANULARITIES[granularity_cb.current()][1]
+            category = None if category_cb.current() == 0 else category_cb.get()
+            view = view_cb.current()
+            if view == 0:
+                buckets = index.buckets(start, end, granularity, category)
+                draw_chart(canvas, [bucket.label for bucket in buckets], {"Total": [bucket.total for bucket in buckets]},
+                           bars=True)
+            elif view == 4:
+                labels = [bucket.label for bucket in index.buckets(start, end, granularity)]
+                draw_chart(canvas, labels, {f"{trend.category} ({trend.slope:+.2f}/période)": trend.totals
+                                            for trend in index.category_trends(start, end, granularity)})
+            else:
+                if view == 1:
+                    points = index.cumulative(start, end, category)
+                else:
+                    points = index.rolling_average(start, end, 7 if view == 2 else 30, category)
+                draw_chart(canvas, [point.date.isoformat() for point in points],
+                           {ANALYTICS_VIEWS[view]: [point.value for point in points]})
+
+            try:
+                revenu = float(self.revenu_var.get())
+            except ValueError:
+                revenu = 0.0
+            burn = index.burn_rate(revenu, start, end)
+            summary = f"Dépensé: {burn.spent:.2f} — {burn.daily_average:.2f} par jour"
+            if burn.ratio is not None:
+                summary += f" — {burn.ratio:.0%} du revenu mensuel"
+            summary_var.set(summary)
+
+        Button(controls, text="Afficher", font=("Segoe UI", 12, "bold"), width=12,
+               command=draw).grid(row=0, column=6, rowspan=2, padx=15)
+        draw()
+
     def load_revenu(self):
-        if os.path.exists("revenu.csv"):
-            with open("revenu.csv", "r", encoding="utf-8") as f:
-                contenu = f.read().strip().replace(",", ".")
-                try:
-                    value = float(contenu)
-                except ValueError:
-                    value = 0.0
-                self.revenu_var.set(f"{value:.2f}")
+        # Un revenu encore en file d'écriture est plus récent que le stockage.
+        contenu = self.ledger.income
+        if contenu is None:
+            contenu = self.repository.read_income()
+        self._saved_revenu = contenu
+        if contenu is not None:
+            contenu = contenu.strip().replace(",", ".")
+            try:
+                value = float(contenu)
+            except ValueError:
+                value = 0.0
+            self.revenu_var.set(f"{value:.2f}")
         else:
             self.revenu_var.set("0.00")
 
 
-    def save_revenu(self):
+    def _normalize_revenu(self):
         raw = (self.revenu_var.get() or "").strip().replace(",", ".")
         try:
             value = float(raw)
@@ -484,59 +1054,174 @@ class ExpenseApp:
             value = 0.0
 
         self.revenu_var.set(f"{value:.2f}")
-        with open("revenu.csv", "w", encoding="utf-8") as f:
-            f.write(f"{value:.2f}")
+        return f"{value:.2f}"
+
+    def save_revenu(self):
+        if self._revenu_save_job is not None:
+            self.root.after_cancel(self._revenu_save_job)
+            self._revenu_save_job = None
+        value = self._normalize_revenu()
+        if value != self._saved_revenu:
+            self.persistence.write_income(value)
+            self.ledger.income = value
+            self._saved_revenu = value
 
     def _normalize_and_save_revenu(self):
-        self.save_revenu()
+        # L'écriture est différée et regroupée: seules les valeurs encore
+        # inchangées après REVENU_SAVE_DELAY_MS atteignent le disque.
+        self._normalize_revenu()
         self.update_total()
+        if self._revenu_save_job is not None:
+            self.root.after_cancel(self._revenu_save_job)
+        self._revenu_save_job = self.root.after(REVENU_SAVE_DELAY_MS, self.save_revenu)
+
+    def _show_persistence_status(self):
+        status = self.persistence.status()
+        if status.error is not None:
+            self.persistence_var.set(f"Erreur d'enregistrement, nouvel essai en cours: {status.error}")
+            self.persistence_label.config(fg="red")
+        else:
+            self.persistence_var.set("Enregistrement..." if status.pending or status.writing else "Enregistré")
+            self.persistence_label.config(fg="black")
+        self.root.after(PERSISTENCE_POLL_MS, self._show_persistence_status)
 
     def on_close(self):
         self.save_revenu()
+        # La fenêtre ne se ferme qu'une fois tous les registres écrits sur disque, sauf abandon explicite.
+        while True:
+            remaining = self.ledgers.close_all(PERSISTENCE_CLOSE_TIMEOUT)
+            if not remaining:
+                break
+            error = self.ledgers.open(remaining[0]).persistence.status().error or "écriture toujours en cours"
+            if not messagebox.askretrycancel("Erreur", f"Certaines modifications ne sont pas encore enregistrées: {error}\n"
+                                             "Réessayer, ou annuler pour quitter sans les enregistrer ?"):
+                break
         self.root.destroy()
 
-    def export_to_excel(self):
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment
-        from tkinter.filedialog import asksaveasfilename
+    def performance_panel(self):
+        popup = Toplevel(self.root)
+        popup.title("Performances")
+        popup.geometry("760x460")
 
+        enabled_var = BooleanVar(value=instrumentation.enabled)
 
-        file_path = asksaveasfilename(defaultextension=".xlsx",
-                                      filetypes=[("Excel files", "*.xlsx")],
-                                      title="Enregistrer le fichier Excel")
-        if not file_path:
-            return
+        def toggle():
+            if enabled_var.get():
+                instrumentation.enable()
+            else:
+                instrumentation.disable()
 
-        try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Dépenses"
+        Checkbutton(popup, text="Mesurer les temps d'exécution", variable=enabled_var, command=toggle,
+                    font=("Segoe UI", 12)).pack(pady=5)
+
+        columns = ("Action", "Appels", "Dernier (ms)", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Max (ms)")
+        tree = Treeview(popup, columns=columns, show="headings", height=12)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=180 if col == "Action" else 85)
+        tree.pack(pady=5, padx=10, fill=BOTH, expand=True)
+
+        cache_var = StringVar()
+        Label(popup, textvariable=cache_var, font=("Segoe UI", 12)).pack()
+
+        profile_frame = Frame(popup)
+        profile_frame.pack(pady=10)
+        Label(profile_frame, text="Profiler le prochain appel de:", font=("Segoe UI", 12)).pack(side=LEFT, padx=5)
+        action_cb = Combobox(profile_frame, values=instrumentation.actions(), font=("Segoe UI", 12),
+                             state="readonly", width=28)
+        action_cb.pack(side=LEFT, padx=5)
+
+        def profile():
+            action = action_cb.get()
+            if not action:
+                messagebox.showerror("Erreur", "Sélectionnez une action à profiler", parent=popup)
+                return
+            path = filedialog.asksaveasfilename(defaultextension=".prof", filetypes=[("cProfile", "*.prof")],
+                                                title="Enregistrer le profil", parent=popup)
+            if not path:
+                return
+            instrumentation.profile_next(action, path)
+            instrumentation.enable()
+            enabled_var.set(True)
+            messagebox.showinfo("Profil", f"Le prochain appel de {action} sera enregistré dans {path}", parent=popup)
 
+        Button(profile_frame, text="Profiler", font=("Segoe UI", 12), command=profile).pack(side=LEFT, padx=5)
+        Button(profile_frame, text="Réinitialiser", font=("Segoe UI", 12),
+               command=instrumentation.reset).pack(side=LEFT, padx=5)
 
-            columns = ["Date", "Catégorie", "Montant", "Description"]
-            for col_num, col_name in enumerate(columns, 1):
-                cell = ws.cell(row=1, column=col_num, value=col_name)
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal="center")
+        def refresh():
+            if not popup.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for timing in instrumentation.stats():
+                tree.insert("", "end", values=(timing.name, timing.count,
+                                               *(f"{seconds * 1000:.2f}" for seconds in timing[2:])))
+            action_cb.configure(values=instrumentation.actions())
+            info = self.manager.cache_info()
+            lookups = info.hits + info.misses
+            cache_var.set(f"Cache des statistiques: {info.hits}/{lookups} "
+                          f"({info.hits / lookups if lookups else 0:.0%}), {info.stale} périmés, "
+                          f"{info.currsize}/{info.maxsize} entrées")
+            self.root.after(PERF_REFRESH_MS, refresh)
+
+        refresh()
 
+    def export_to_excel(self):
+        from tkinter.filedialog import asksaveasfilename
 
-            for row_num, exp in enumerate(self.manager.expenses, 2):
-                ws.cell(row=row_num, column=1, value=exp.date)
-                ws.cell(row=row_num, column=2, value=exp.category)
-                ws.cell(row=row_num, column=3, value=exp.amount)
-                ws.cell(row=row_num, column=4, value=exp.description)
-                ws.cell(row=row_num, column=3).alignment = Alignment(horizontal="right")
 
+        file_path = asksaveasfilename(defaultextension=".xlsx",
+                                      filetypes=EXPORT_FORMATS,
+                                      title="Exporter les dépenses")
+        if not file_path:
+            return
 
-            for column_cells in ws.columns:
-                length = max(len(str(cell.value)) if cell.value else 0 for cell in column_cells)
-                ws.column_dimensions[column_cells[0].column_letter].width = length + 2
+        # L'export tourne sur un thread à partir d'une copie des dépenses;
+        # la progression revient par une file lue depuis la boucle Tk.
+        snapshot = self.manager.snapshot()
+        cancel = threading.Event()
+        messages = queue.Queue()
 
-            wb.save(file_path)
-            messagebox.showinfo("Succès", f"Les dépenses ont été exportées vers {file_path}")
+        popup = Toplevel(self.root)
+        popup.title("Export")
+        popup.geometry("400x150")
+        popup.resizable(False, False)
+        progress_var = StringVar(value="Export en cours...")
+        Label(popup, textvariable=progress_var, font=("Segoe UI", 12)).pack(pady=20)
+        Button(popup, text="Annuler", font=("Segoe UI", 12), command=cancel.set).pack(pady=5)
+        popup.protocol("WM_DELETE_WINDOW", cancel.set)
+
+        def work():
+            try:
+                export_expenses(snapshot, file_path,
+                                progress=lambda done, total: messages.put(("progress", done, total)),
+                                cancelled=cancel.is_set)
+                messages.put(("done",))
+            except ExportCancelled:
+                messages.put(("cancelled",))
+            except Exception as e:
+                messages.put(("error", e))
+
+        def poll():
+            while True:
+                try:
+                    message = messages.get_nowait()
+                except queue.Empty:
+                    self.root.after(100, poll)
+                    return
+                if message[0] == "progress":
+                    progress_var.set(f"Export en cours... {message[1]} / {message[2]}")
+                    continue
+                popup.destroy()
+                if message[0] == "done":
+                    messagebox.showinfo("Succès", f"Les dépenses ont été exportées vers {file_path}")
+                elif message[0] == "error":
+                    messagebox.showerror("Erreur", f"Une erreur est survenue lors de l'export: {message[1]}")
+                return
 
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Une erreur est survenue lors de l'export: {e}")
+        threading.Thread(target=work, daemon=True).start()
+        poll()
 
 
-ExpenseApp()
\ No newline at end of file
+if __name__ == "__main__":
+    ExpenseApp()
\ No newline at end of file
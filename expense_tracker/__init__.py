@@ -0,0 +1,18 @@
+"""Backend du suivi des dépenses, utilisable sans interface graphique.
+
+Les agrégats NumPy et l'export sont dans `expense_tracker.aggregation` et
+`expense_tracker.export`, importés seulement quand ils servent.
+"""
+from .models import Aggregate, Expense, ExpenseManager, categories, expense_columns, expense_from_row, month_range
+from .storage import (
+    CsvRepository,
+    ExpenseRepository,
+    SqliteRepository,
+    default_repository,
+    import_csv,
+    iter_expenses,
+    load_manager,
+    load_expenses,
+    open_repository,
+    save_expenses,
+)
@@ -0,0 +1,75 @@
+from datetime import date
+
+import numpy as np
+
+from .instrumentation import timed
+from .models import _EPOCH_ORDINAL, Aggregate, _to_ordinal, categories
+
+GROUPINGS = ("day", "month", "year", "category")
+
+
+def _select(manager, start, end):
+    ordinals, codes, cents = manager.columns()
+    if start is not None or end is not None:
+        mask = np.ones(len(ordinals), dtype=np.bool_)
+        if start is not None:
+            mask &= ordinals >= _to_ordinal(start)
+        if end is not None:
+            mask &= ordinals <= _to_ordinal(end)
+        ordinals, codes, cents = ordinals[mask], codes[mask], cents[mask]
+    return ordinals, codes, cents
+
+
+def _group_keys(grouping, ordinals, codes):
+    if grouping == "day":
+        return ordinals.astype(np.int64)
+    if grouping == "category":
+        return codes.astype(np.int64)
+    days = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+    if grouping == "month":
+        return days.astype("datetime64[M]").astype(np.int64)
+    if grouping == "year":
+        return days.astype("datetime64[Y]").astype(np.int64)
+    raise ValueError(f"Regroupement inconnu: {grouping}")
+
+
+def _label(grouping, value):
+    value = int(value)
+    if grouping == "day":
+        return date.fromordinal(value).isoformat()
+    if grouping == "month":
+        return f"{1970 + value // 12}-{value % 12 + 1:02d}"
+    if grouping == "year":
+        return 1970 + value
+    return categories[value]
+
+
+@timed("aggregation.expense_total")
+def expense_total(manager, start=None, end=None):
+    return int(_select(manager, start, end)[2].sum()) / 100
+
+
+@timed("aggregation.aggregate")
+def aggregate(manager, by=("category",), start=None, end=None):
+    """Somme, nombre et pourcentage par groupe, sur [start, end] inclus.
+
+    `by` combine les regroupements de GROUPINGS, par exemple ("month", "category").
+    """
+    ordinals, codes, cents = _select(manager, start, end)
+    if not len(cents):
+        return []
+    grand_total = int(cents.sum())
+    if not by:
+        return [Aggregate((), grand_total / 100, len(cents), 100.0)]
+
+    keys = np.column_stack([_group_keys(grouping, ordinals, codes) for grouping in by])
+    groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    totals = np.bincount(inverse, weights=cents, minlength=len(groups))
+    counts = np.bincount(inverse, minlength=len(groups))
+
+    results = []
+    for group, total, count in zip(groups, totals.tolist(), counts.tolist()):
+        key = tuple(_label(grouping, value) for grouping, value in zip(by, group))
+        results.append(Aggregate(key, total / 100, count, total / grand_total * 100 if grand_total else 0.0))
+    return results
@@ -0,0 +1,121 @@
+"""Analyses sur des plages de dates: périodes, cumul, moyennes glissantes, tendances.
+
+SpendingIndex tient des sommes préfixes journalières (totales et par catégorie)
+construites depuis l'index journalier de l'ExpenseManager. Le total d'une plage
+coûte deux lectures; une série de k points coûte O(k), quelle que soit la
+taille de l'historique.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+
+from .models import _to_ordinal, categories
+
+GRANULARITIES = ("week", "month", "year")
+
+Bucket = namedtuple("Bucket", ["label", "start", "end", "total"])
+Point = namedtuple("Point", ["date", "value"])
+Trend = namedtuple("Trend", ["category", "totals", "slope"])
+BurnRate = namedtuple("BurnRate", ["spent", "daily_average", "daily_income", "ratio"])
+
+
+def _periods(first, last, granularity):
+    # (libellé, premier ordinal, dernier ordinal) de chaque période, rognées à [first, last].
+    periods = []
+    day = date.fromordinal(first)
+    while day.toordinal() <= last:
+        if granularity == "week":
+            year, week, _ = day.isocalendar()
+            label = f"{year}-S{week:02d}"
+            following = day + timedelta(days=7 - day.weekday())
+        elif granularity == "month":
+            label = f"{day.year}-{day.month:02d}"
+            following = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+        elif granularity == "year":
+            label = str(day.year)
+            following = date(day.year + 1, 1, 1)
+        else:
+            raise ValueError(f"Granularité inconnue: {granularity}")
+        periods.append((label, day.toordinal(), min(following.toordinal() - 1, last)))
+        day = following
+    return periods
+
+
+class SpendingIndex:
+    """Sommes préfixes journalières; voir ExpenseManager.spending_index."""
+
+    def __init__(self, daily):
+        # `daily`: ordinal -> _Totals, l'index journalier de l'ExpenseManager.
+        self.first = min(daily) if daily else 0
+        size = max(daily) - self.first + 1 if daily else 0
+        codes = {category: code for code, category in enumerate(categories)}
+        cents = np.zeros((len(categories), size + 1), dtype=np.int64)
+        for ordinal, totals in daily.items():
+            for category, (amount, _) in totals.categories.items():
+                cents[codes[category], ordinal - self.first + 1] = amount
+        # Colonne i: centimes dépensés jusqu'au jour first + i - 1 inclus.
+        self._prefix = np.cumsum(cents, axis=1)
+        self._total = self._prefix.sum(axis=0)
+
+    def _sums(self, starts, ends, category=None):
+        prefix = self._total if category is None else self._prefix[categories.index(category)]
+        last = len(prefix) - 1
+        ends = np.clip(np.asarray(ends) - self.first + 1, 0, last)
+        starts = np.clip(np.asarray(starts) - self.first, 0, last)
+        return (prefix[ends] - prefix[starts]) / 100
+
+    @staticmethod
+    def _range(start, end):
+        first, last = _to_ordinal(start), _to_ordinal(end)
+        if first > last:
+            raise ValueError("Plage de dates invalide")
+        return first, last
+
+    def total(self, start, end, category=None):
+        first, last = self._range(start, end)
+        return float(self._sums([first], [last], category)[0])
+
+    def buckets(self, start, end, granularity="month", category=None):
+        """Total de chaque semaine, mois ou année de [start, end]."""
+        periods = _periods(*self._range(start, end), granularity)
+        _, firsts, lasts = zip(*periods)
+        totals = self._sums(firsts, lasts, category).tolist()
+        return [Bucket(label, date.fromordinal(first), date.fromordinal(last), total)
+                for (label, first, last), total in zip(periods, totals)]
+
+    def cumulative(self, start, end, category=None):
+        """Dépense cumulée depuis `start`, jour par jour."""
+        first, last = self._range(start, end)
+        days = np.arange(first, last + 1)
+        return [Point(date.fromordinal(day), value)
+                for day, value in zip(days.tolist(), self._sums(np.full(len(days), first), days, category).tolist())]
+
+    def rolling_average(self, start, end, window=7, category=None):
+        """Moyenne journalière sur les `window` jours se terminant à chaque jour de [start, end]."""
+        first, last = self._range(start, end)
+        days = np.arange(first, last + 1)
+        values = self._sums(days - window + 1, days, category) / window
+        return [Point(date.fromordinal(day), value) for day, value in zip(days.tolist(), values.tolist())]
+
+    def category_trends(self, start, end, granularity="month"):
+        """Totaux par catégorie alignés sur buckets(start, end, granularity), avec leur pente (par période)."""
+        periods = _periods(*self._range(start, end), granularity)
+        _, firsts, lasts = zip(*periods)
+        trends = []
+        for category in categories:
+            totals = self._sums(firsts, lasts, category)
+            slope = float(np.polyfit(np.arange(len(totals)), totals, 1)[0]) if len(totals) > 1 else 0.0
+            trends.append(Trend(category, totals.tolist(), slope))
+        return trends
+
+    def burn_rate(self, income, start, end):
+        """Dépense moyenne par jour sur [start, end] comparée au revenu mensuel `income`.
+
+        `ratio` > 1 signifie que le rythme de dépense dépasse le revenu; None sans revenu.
+        """
+        first, last = self._range(start, end)
+        spent = float(self._sums([first], [last])[0])
+        daily_average = spent / (last - first + 1)
+        daily_income = income * 12 / 365.25
+        return BurnRate(spent, daily_average, daily_income, daily_average / daily_income if daily_income else None)
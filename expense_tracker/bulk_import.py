@@ -0,0 +1,80 @@
+"""Import en parallèle de nombreux fichiers au format depenses.csv.
+
+L'analyse et la validation (mêmes règles qu'Expense, plus la date) se font
+dans un pool de processus, un fichier par tâche. Chaque fichier revient en
+lignes normalisées pour le stockage et en colonnes pour
+ExpenseManager.add_columns, sans nouvelle validation. Les résultats reviennent
+dans l'ordre des fichiers: à ID égal, le premier fichier l'emporte.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+from .models import expense_columns, expense_from_row
+from .storage import CsvRepository
+
+ImportReport = namedtuple("ImportReport", ["files", "imported", "rejected", "duplicates", "seconds"])
+
+
+def parse_file(path):
+    # Exécuté dans un processus du pool: renvoie les lignes valides normalisées,
+    # les mêmes dépenses en colonnes (ids, ordinaux, codes, centimes,
+    # descriptions) et le nombre de lignes refusées.
+    expenses = []
+    rejected = 0
+    for rows in CsvRepository(path, None).iter_chunks():
+        for row in rows:
+            try:
+                expenses.append(expense_from_row(row))
+            except ValueError:
+                rejected += 1
+    return [expense.to_row() for expense in expenses], expense_columns(expenses), rejected
+
+
+def _parsed_files(paths, workers):
+    if workers == 1 or len(paths) == 1:
+        return map(parse_file, paths)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    # map() soumet tout de suite; l'exécuteur se ferme une fois les résultats lus.
+    results = executor.map(parse_file, paths)
+    executor.shutdown(wait=False)
+    return results
+
+
+def bulk_import(paths, manager=None, repository=None, workers=None):
+    """Importe `paths` dans `manager` et/ou `repository` en une seule passe de fusion.
+
+    Les ID déjà présents (dans le manager, sinon dans le stockage) ou vus dans
+    un fichier précédent sont comptés comme doublons et ignorés.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if manager is not None:
+        seen = set(manager.ids())
+    elif repository is not None:
+        seen = {row[0] for rows in repository.iter_chunks() for row in rows}
+    else:
+        seen = set()
+
+    imported = rejected = duplicates = 0
+    for accepted, columns, file_rejected in _parsed_files(list(paths), workers):
+        rejected += file_rejected
+        keep = []
+        for index, exp_id in enumerate(columns[0]):
+            if exp_id in seen:
+                duplicates += 1
+                continue
+            seen.add(exp_id)
+            keep.append(index)
+        if len(keep) < len(accepted):
+            ids, ordinals, codes, cents, descriptions = columns
+            columns = ([ids[index] for index in keep], ordinals[keep], codes[keep], cents[keep],
+                       [descriptions[index] for index in keep])
+            accepted = [accepted[index] for index in keep]
+        if manager is not None:
+            manager.add_columns(*columns)
+        if repository is not None:
+            repository.add_many(accepted)
+        imported += len(keep)
+    return ImportReport(len(paths), imported, rejected, duplicates, time.perf_counter() - start)
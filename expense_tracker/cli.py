@@ -0,0 +1,193 @@
+"""Interface en ligne de commande pour les traitements par lots.
+
+    python -m expense_tracker import depenses-*.csv
+    python -m expense_tracker daily 2024-03-15
+    python -m expense_tracker monthly 2024 3
+    python -m expense_tracker stats --start 2024-01-01 --end 2024-12-31 --by month,category
+    python -m expense_tracker export depenses.xlsx
+    python -m expense_tracker csv-to-binary
+    python -m expense_tracker --ledger Alice monthly 2024 3
+    python -m expense_tracker consolidated --by month,ledger --start 2024-01
+"""
+import argparse
+import os
+import sys
+
+from . import instrumentation
+from .bulk_import import bulk_import
+from .ledgers import CONSOLIDATED_GROUPINGS, DEFAULT_LEDGER, LEDGERS_DIRECTORY, LedgerSet
+from .models import ExpenseManager, _parse_date
+from .storage import (DATABASE, FILENAME, LEDGER, REVENU_FILENAME, SqliteRepository, import_csv, load_manager,
+                      open_repository)
+
+
+def _date(value):
+    if _parse_date(value) is None:
+        raise argparse.ArgumentTypeError(f"date invalide: {value!r} (attendu AAAA-MM-JJ)")
+    return value
+
+
+def _month(value):
+    try:
+        year, month = map(int, value.split("-"))
+    except ValueError:
+        month = 0
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"mois invalide: {value!r} (attendu AAAA-MM)")
+    return year, month
+
+
+def _groupings(value, choices=None):
+    from .aggregation import GROUPINGS
+
+    choices = choices or GROUPINGS
+    by = tuple(part for part in value.split(",") if part)
+    unknown = [part for part in by if part not in choices]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"regroupement inconnu: {', '.join(unknown)}")
+    return by
+
+
+def _manager_for_totals(repository):
+    # Avec SQLite, les totaux sont des requêtes SQL: inutile de tout charger.
+    if repository.supports_aggregates:
+        return ExpenseManager(repository)
+    return load_manager(repository)
+
+
+def import_files(repository, paths, workers, out):
+    report = bulk_import(paths, repository=repository, workers=workers)
+    print(f"{report.imported} dépenses importées, {report.rejected} refusées, "
+          f"{report.duplicates} doublons ({report.seconds:.1f} s)", file=out)
+
+
+def print_aggregates(results, out):
+    for key, total, count, percentage in results:
+        print("\t".join([*map(str, key), f"{total:.2f}", str(count), f"{percentage:.1f}%"]), file=out)
+
+
+def print_timings(out):
+    print("action\tappels\tdernier_ms\tp50_ms\tp90_ms\tp99_ms\tmax_ms", file=out)
+    for timing in instrumentation.stats():
+        print("\t".join([timing.name, str(timing.count), *(f"{seconds * 1000:.3f}" for seconds in timing[2:])]),
+              file=out)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m expense_tracker",
+                                     description="Suivi des dépenses sans interface graphique.")
+    parser.add_argument("--storage", choices=["csv", "sqlite", "binary"],
+                        help="stockage à utiliser (par défaut: DEPENSES_STORAGE ou csv)")
+    parser.add_argument("--timings", action="store_true",
+                        help="afficher sur stderr les temps des actions instrumentées")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER,
+                        help=f"registre nommé à utiliser (par défaut: {DEFAULT_LEDGER}, le dossier courant)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("import", help="importer des fichiers au format depenses.csv")
+    command.add_argument("files", nargs="+")
+    command.add_argument("--workers", type=int, help="processus d'analyse (par défaut: nombre de CPU)")
+
+    commands.add_parser("import-sqlite", help=f"copier {FILENAME} et {REVENU_FILENAME} dans {DATABASE}")
+    commands.add_parser("csv-to-binary", help=f"convertir {FILENAME} en registre binaire {LEDGER}")
+    commands.add_parser("binary-to-csv", help=f"réécrire {FILENAME} depuis le registre binaire {LEDGER}")
+
+    command = commands.add_parser("daily", help="total d'une journée")
+    command.add_argument("date", type=_date)
+
+    command = commands.add_parser("monthly", help="total d'un mois")
+    command.add_argument("year", type=int)
+    command.add_argument("month", type=int, choices=range(1, 13), metavar="month")
+
+    command = commands.add_parser("stats", help="totaux, nombres et pourcentages par groupe")
+    command.add_argument("--start", type=_date)
+    command.add_argument("--end", type=_date)
+    command.add_argument("--by", type=_groupings, default=("category",),
+                         help="regroupements séparés par des virgules: day, month, year, category")
+
+    command = commands.add_parser("export", help="exporter vers .xlsx, .csv ou .parquet")
+    command.add_argument("path")
+
+    commands.add_parser("ledgers", help=f"lister les registres (dans {LEDGERS_DIRECTORY})")
+    command = commands.add_parser("create-ledger", help="créer un registre nommé")
+    command.add_argument("name")
+
+    command = commands.add_parser("consolidated", help="totaux de tous les registres, depuis leurs résumés mensuels")
+    command.add_argument("--start", type=_month, help="premier mois (AAAA-MM)")
+    command.add_argument("--end", type=_month, help="dernier mois (AAAA-MM)")
+    command.add_argument("--by", type=lambda value: _groupings(value, CONSOLIDATED_GROUPINGS), default=("month",),
+                         help="regroupements séparés par des virgules: ledger, month, category")
+    return parser
+
+
+def main(argv=None, out=sys.stdout):
+    args = build_parser().parse_args(argv)
+    if args.timings:
+        instrumentation.enable()
+    try:
+        return _run(args, out)
+    finally:
+        if args.timings:
+            print_timings(sys.stderr)
+
+
+def _run(args, out):
+    ledgers = LedgerSet(backend=args.storage)
+    if args.command == "ledgers":
+        for name in ledgers.names():
+            print(name, file=out)
+        return 0
+    if args.command == "create-ledger":
+        print(f"Registre {ledgers.create(args.name)} créé", file=out)
+        return 0
+    if args.command == "consolidated":
+        print_aggregates(ledgers.consolidated(args.by, start=args.start, end=args.end), out)
+        return 0
+
+    if args.ledger not in ledgers.names():
+        raise SystemExit(f"Registre non trouvé: {args.ledger}")
+    directory = ledgers.location(args.ledger)
+    path = (lambda name: os.path.join(directory, name)) if directory else (lambda name: name)
+    if args.command == "import-sqlite":
+        repository = SqliteRepository(path(DATABASE))
+        try:
+            imported, skipped = import_csv(path(FILENAME), repository, path(REVENU_FILENAME))
+        finally:
+            repository.close()
+        print(f"{imported} dépenses importées dans {path(DATABASE)}, {skipped} ignorées", file=out)
+        return 0
+    if args.command == "csv-to-binary":
+        from .ledger import csv_to_ledger
+
+        converted, skipped = csv_to_ledger(path(FILENAME), path(LEDGER))
+        print(f"{converted} dépenses converties dans {path(LEDGER)}, {skipped} ignorées", file=out)
+        return 0
+    if args.command == "binary-to-csv":
+        from .ledger import ledger_to_csv
+
+        print(f"{ledger_to_csv(path(LEDGER), path(FILENAME))} dépenses réécrites dans {path(FILENAME)}", file=out)
+        return 0
+
+    repository = open_repository(args.storage, directory)
+    try:
+        if args.command == "import":
+            import_files(repository, args.files, args.workers, out)
+        elif args.command == "daily":
+            print(f"{_manager_for_totals(repository).daily_total(args.date):.2f}", file=out)
+        elif args.command == "monthly":
+            print(f"{_manager_for_totals(repository).monthly_total(args.year, args.month):.2f}", file=out)
+        elif args.command == "stats":
+            if args.by == ("category",) and args.start and args.end:
+                results = _manager_for_totals(repository).category_totals(args.start, args.end)
+            else:
+                from .aggregation import aggregate
+
+                results = aggregate(load_manager(repository), by=args.by, start=args.start, end=args.end)
+            print_aggregates(results, out)
+        elif args.command == "export":
+            from .export import export_expenses
+
+            export_expenses(load_manager(repository), args.path)
+    finally:
+        repository.close()
+    return 0
@@ -0,0 +1,127 @@
+import csv
+import os
+
+import numpy as np
+
+from .instrumentation import timed
+from .models import _EPOCH_ORDINAL, categories
+
+EXPORT_COLUMNS = ["Date", "Catégorie", "Montant", "Description"]
+EXPORT_FORMATS = [("Excel files", "*.xlsx"), ("CSV", "*.csv"), ("Parquet", "*.parquet")]
+EXPORT_CHUNK = 5000
+PARQUET_ROW_GROUP = 100_000
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _column_widths(manager):
+    # En écriture seule, openpyxl écrit les largeurs avant la première ligne:
+    # elles sont calculées en une passe sur les colonnes en mémoire.
+    ordinals, codes, cents = manager.columns()
+    longest = [10 if len(ordinals) else 0,
+               max((len(categories[code]) for code in np.unique(codes)), default=0),
+               len(str(int(cents.max()) / 100)) if len(cents) else 0,
+               max(map(len, manager.descriptions()), default=0)]
+    return [max(len(header), length) + 2 for header, length in zip(EXPORT_COLUMNS, longest)]
+
+
+def _export_rows(manager, report):
+    total = len(manager)
+    for done, expense in enumerate(manager, 1):
+        yield expense
+        if done % EXPORT_CHUNK == 0 or done == total:
+            report(done, total)
+
+
+def _export_xlsx(manager, path, report):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Dépenses")
+    for letter, width in zip("ABCD", _column_widths(manager)):
+        ws.column_dimensions[letter].width = width
+
+    bold, center = Font(bold=True), Alignment(horizontal="center")
+    header = []
+    for col_name in EXPORT_COLUMNS:
+        cell = WriteOnlyCell(ws, value=col_name)
+        cell.font = bold
+        cell.alignment = center
+        header.append(cell)
+    ws.append(header)
+
+    # Une seule cellule stylée, réutilisée: chaque ligne est écrite dès l'append.
+    amount = WriteOnlyCell(ws)
+    amount.alignment = Alignment(horizontal="right")
+    for exp in _export_rows(manager, report):
+        amount.value = exp.amount
+        ws.append([exp.date, exp.category, amount, exp.description])
+    wb.save(path)
+
+
+def _export_csv(manager, path, report):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows([exp.date, exp.category, f"{exp.amount:.2f}", exp.description]
+                         for exp in _export_rows(manager, report))
+
+
+def _export_parquet(manager, path, report):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("L'export Parquet nécessite pyarrow") from None
+
+    ordinals, codes, cents = manager.columns()
+    descriptions = manager.descriptions()
+    category_names = pa.array(categories, type=pa.string())
+    schema = pa.schema([("Date", pa.date32()),
+                        ("Catégorie", pa.dictionary(pa.int8(), pa.string())),
+                        ("Montant", pa.float64()),
+                        ("Description", pa.string())])
+    total = len(cents)
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, total, PARQUET_ROW_GROUP):
+            stop = min(start + PARQUET_ROW_GROUP, total)
+            writer.write_batch(pa.record_batch([
+                pa.array((ordinals[start:stop] - _EPOCH_ORDINAL).astype(np.int32), type=pa.date32()),
+                pa.DictionaryArray.from_arrays(pa.array(codes[start:stop].astype(np.int8)), category_names),
+                pa.array(cents[start:stop] / 100),
+                pa.array(descriptions[start:stop], type=pa.string()),
+            ], schema=schema))
+            report(stop, total)
+
+
+_EXPORTERS = {".xlsx": _export_xlsx, ".csv": _export_csv, ".parquet": _export_parquet}
+
+
+@timed("export")
+def export_expenses(manager, path, progress=None, cancelled=None):
+    """Exporte les dépenses vers `path` (.xlsx, .csv ou .parquet) en flux.
+
+    `progress(faites, total)` est appelé par paquets; si `cancelled()` devient
+    vrai, l'export s'arrête avec ExportCancelled sans laisser de fichier partiel.
+    """
+    exporter = _EXPORTERS.get(os.path.splitext(path)[1].lower())
+    if exporter is None:
+        raise ValueError("Format d'export inconnu")
+
+    def report(done, total):
+        if cancelled is not None and cancelled():
+            raise ExportCancelled
+        if progress is not None:
+            progress(done, total)
+
+    tmp_path = path + ".tmp"
+    try:
+        exporter(manager, tmp_path, report)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,115 @@
+"""Chronométrage et comptage des chemins critiques.
+
+Désactivé par défaut (DEPENSES_PROFILE=1 pour l'activer au démarrage): un appel
+instrumenté ne coûte alors qu'un test de booléen. Une fois activé, les durées
+récentes de chaque action sont gardées pour en tirer des percentiles, et
+`profile_next` enregistre une trace cProfile du prochain appel d'une action.
+"""
+from collections import deque, namedtuple
+import cProfile
+import functools
+import os
+import time
+
+# Nombre de durées gardées par action pour les percentiles.
+HISTORY = 500
+
+Timing = namedtuple("Timing", "name count last p50 p90 p99 max")
+
+enabled = os.environ.get("DEPENSES_PROFILE") == "1"
+_actions = set()
+_samples = {}
+_counts = {}
+_profiles = {}
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    _samples.clear()
+    _counts.clear()
+
+
+def actions():
+    return sorted(_actions | _samples.keys())
+
+
+def profile_next(name, path):
+    # Le prochain appel de `name` (instrumentation activée) est profilé dans `path`.
+    _profiles[name] = path
+
+
+def record(name, seconds):
+    samples = _samples.get(name)
+    if samples is None:
+        samples = _samples.setdefault(name, deque(maxlen=HISTORY))
+    samples.append(seconds)
+    _counts[name] = _counts.get(name, 0) + 1
+
+
+class span:
+    """Bloc chronométré: `with span("nom"): ...`."""
+
+    __slots__ = ("name", "start", "profiler")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+        self.profiler = None
+
+    def __enter__(self):
+        if enabled:
+            if _profiles and self.name in _profiles:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is None:
+            return False
+        record(self.name, time.perf_counter() - self.start)
+        if self.profiler is not None:
+            self.profiler.disable()
+            path = _profiles.pop(self.name, None)
+            if path:
+                self.profiler.dump_stats(path)
+        return False
+
+
+def timed(name):
+    """Décorateur: chronomètre chaque appel sous le nom `name`."""
+    def decorator(func):
+        _actions.add(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def stats():
+    timings = []
+    for name in sorted(_samples):
+        ordered = sorted(_samples[name])
+        if not ordered:
+            continue
+        timings.append(Timing(name, _counts.get(name, 0), _samples[name][-1], _percentile(ordered, 0.5),
+                              _percentile(ordered, 0.9), _percentile(ordered, 0.99), ordered[-1]))
+    return timings
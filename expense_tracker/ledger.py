@@ -0,0 +1,510 @@
+"""Registre binaire à enregistrements de taille fixe, lu par mmap.
+
+depenses.bin commence par un en-tête (MAGIC puis un jeton de 8 octets) suivi
+d'un enregistrement RECORD par dépense: UUID sur 16 octets, ordinal de la date,
+centimes, code catégorie, drapeau de suppression, puis position et longueur de
+la description dans le tas depenses.bin.heap. Chaque description distincte n'y
+est écrite qu'une fois. Le tas commence par le même jeton que le registre,
+pour détecter une paire dépareillée après un remplacement interrompu; la
+paire est alors complétée par le fichier temporaire resté en place.
+
+Un ajout écrit et synchronise le tas avant les enregistrements: un
+enregistrement ne pointe jamais hors du tas, et un enregistrement tronqué par
+un arrêt brutal est ignoré à la lecture puis écrasé par l'ajout suivant.
+"""
+from datetime import date
+import mmap
+import os
+import sys
+import threading
+import uuid
+
+import numpy as np
+
+from .models import _parse_date, categories, expense_from_row
+from .storage import CsvRepository, ExpenseRepository, _sync_files
+
+MAGIC = b"DEPBIN01"
+HEADER_SIZE = len(MAGIC) + 8
+
+RECORD = np.dtype([
+    ("id", "S16"),
+    ("date", "<i4"),
+    ("cents", "<i8"),
+    ("category", "u1"),
+    ("deleted", "u1"),
+    ("description", "<u8"),
+    ("length", "<u4"),
+])
+_DELETED_OFFSET = RECORD.fields["deleted"][1]
+
+_CATEGORY_CODES = {category: code for code, category in enumerate(categories)}
+
+
+def heap_path(path):
+    return path + ".heap"
+
+
+def _id_bytes(expense_id):
+    # Seuls les UUID sous leur forme canonique sont stockables (aller-retour exact).
+    try:
+        value = uuid.UUID(expense_id)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or str(value) != expense_id:
+        raise ValueError("ID non UUID")
+    return value.bytes
+
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+# Colonnes des chiffres hexadécimaux dans un UUID formaté; les autres sont des tirets.
+_HEX_COLUMNS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+# Taille des blocs d'ID formatés d'un coup par MappedColumns.
+FORMAT_CHUNK = 50_000
+
+
+def _format_ids(ids):
+    # Formatage vectorisé: chaque octet donne deux caractères, puis une seule
+    # chaîne ASCII est découpée tous les 36 caractères.
+    raw = np.frombuffer(ids.tobytes(), dtype=np.uint8).reshape(-1, 16)
+    chars = np.full((len(raw), 36), ord("-"), dtype=np.uint8)
+    chars[:, _HEX_COLUMNS[0::2]] = _HEX[raw >> 4]
+    chars[:, _HEX_COLUMNS[1::2]] = _HEX[raw & 15]
+    text = chars.tobytes().decode("ascii")
+    return [text[i:i + 36] for i in range(0, len(text), 36)]
+
+
+def _descriptions(heap, records):
+    # Descriptions de `records`, décodées une fois par emplacement dans le tas.
+    heap = memoryview(heap)
+    decoded = {}
+    texts = []
+    for location in zip(records["description"].tolist(), records["length"].tolist()):
+        text = decoded.get(location)
+        if text is None:
+            start, length = location
+            text = decoded[location] = sys.intern(str(heap[start:start + length], "utf-8"))
+        texts.append(text)
+    return texts
+
+
+def _encode(row):
+    exp_id, date_str, category, amount_str, description = row[:5]
+    day = _parse_date(date_str)
+    if day is None:
+        raise ValueError("Date invalide")
+    code = _CATEGORY_CODES.get(category)
+    if code is None:
+        raise ValueError("Catégorie non trouvée")
+    return _id_bytes(exp_id), day.toordinal(), round(float(amount_str) * 100), code, description
+
+
+def _token(name, offset):
+    # Jeton lu à `offset`, ou None si le fichier n'existe pas.
+    try:
+        with open(name, "rb") as file:
+            file.seek(offset)
+            return file.read(8)
+    except FileNotFoundError:
+        return None
+
+
+def _create(path, token):
+    for name, content in ((heap_path(path), token), (path, MAGIC + token)):
+        with open(name, "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class BinaryLedger:
+    """Registre binaire ouvert: lecture sans copie, ajouts et suppressions sur place."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            _create(path, os.urandom(8))
+        self._open()
+
+    def _open(self):
+        self._records = open(self.path, "r+b")
+        self._heap = open(heap_path(self.path), "r+b")
+        header = self._records.read(HEADER_SIZE)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError("Registre binaire invalide")
+        if self._heap.read(8) != header[len(MAGIC):]:
+            self._records.close()
+            self._heap.close()
+            if not self._recover():
+                raise ValueError("Registre binaire et tas dépareillés")
+            self._open()
+            return
+        self._count = (os.fstat(self._records.fileno()).st_size - HEADER_SIZE) // RECORD.itemsize
+        self._heap_size = os.fstat(self._heap.fileno()).st_size
+        self._map = self._heap_map = None
+        self._offsets = None
+
+    def _recover(self):
+        # rewrite() interrompu entre ses deux os.replace: le fichier temporaire
+        # restant est complet et synchronisé; il termine le remplacement s'il
+        # porte le jeton du fichier déjà remplacé.
+        tmp_path = self.path + ".tmp"
+        if _token(tmp_path, len(MAGIC)) == _token(heap_path(self.path), 0):
+            os.replace(tmp_path, self.path)
+        elif _token(heap_path(tmp_path), 0) == _token(self.path, len(MAGIC)):
+            os.replace(heap_path(tmp_path), heap_path(self.path))
+        else:
+            return False
+        return True
+
+    def _mapped(self):
+        # Les projections sont refaites quand des ajouts ont agrandi les fichiers;
+        # les anciennes restent valides tant que des vues les utilisent.
+        if self._map is None or len(self._map) < HEADER_SIZE + self._count * RECORD.itemsize:
+            self._map = mmap.mmap(self._records.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._heap_map is None or len(self._heap_map) < self._heap_size:
+            self._heap_map = mmap.mmap(self._heap.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map, self._heap_map
+
+    def records(self):
+        # Vue NumPy sans copie sur tous les enregistrements, supprimés compris.
+        mapped, _ = self._mapped()
+        return np.frombuffer(mapped, dtype=RECORD, count=self._count, offset=HEADER_SIZE)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.records()["deleted"] == 0))
+
+    def descriptions(self, records):
+        _, heap = self._mapped()
+        return _descriptions(heap, records)
+
+    def mapped(self):
+        # Instantané sans copie des enregistrements actuels, voir MappedColumns.
+        with self._lock:
+            records = self.records()
+            _, heap = self._mapped()
+            return MappedColumns(records, heap)
+
+    def iter_columns(self, chunk_size=50_000):
+        """Colonnes des dépenses vivantes, par paquets, au format d'ExpenseManager.add_columns."""
+        with self._lock:
+            records = self.records()
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            chunk = chunk[chunk["deleted"] == 0]
+            yield _format_ids(chunk["id"]), chunk["date"], chunk["category"], chunk["cents"], self.descriptions(chunk)
+
+    def iter_rows(self, chunk_size=5000):
+        for ids, ordinals, codes, cents, descriptions in self.iter_columns(chunk_size):
+            yield [[exp_id, date.fromordinal(ordinal).isoformat(), categories[code], f"{amount / 100:.2f}", description]
+                   for exp_id, ordinal, code, amount, description
+                   in zip(ids, ordinals.tolist(), codes.tolist(), cents.tolist(), descriptions)]
+
+    def _description_offsets(self):
+        # Description -> (position, longueur) dans le tas, construit au premier ajout.
+        if self._offsets is None:
+            records = self.records()
+            locations = np.stack([records["description"], records["length"].astype(np.uint64)], axis=1)
+            _, first = np.unique(locations, axis=0, return_index=True)
+            unique = records[first]
+            self._offsets = dict(zip(self.descriptions(unique),
+                                     zip(unique["description"].tolist(), unique["length"].tolist())))
+        return self._offsets
+
+    def _encode_records(self, rows):
+        # Enregistrements de `rows`; les nouvelles descriptions sont écrites et
+        # synchronisées dans le tas avant tout enregistrement. Sous self._lock.
+        encoded = [_encode(row) for row in rows]
+        records = np.zeros(len(encoded), dtype=RECORD)
+        if not encoded:
+            return records
+        ids, ordinals, cents, codes, descriptions = zip(*encoded)
+        records["id"] = ids
+        records["date"] = ordinals
+        records["cents"] = cents
+        records["category"] = codes
+
+        offsets = self._description_offsets()
+        new_offsets = {}
+        heap = bytearray()
+        locations = []
+        for description in descriptions:
+            location = offsets.get(description) or new_offsets.get(description)
+            if location is None:
+                data = description.encode("utf-8")
+                location = new_offsets[description] = (self._heap_size + len(heap), len(data))
+                heap += data
+            locations.append(location)
+        records["description"], records["length"] = zip(*locations)
+
+        if heap:
+            self._heap.seek(self._heap_size)
+            self._heap.write(heap)
+            self._heap.flush()
+            os.fsync(self._heap.fileno())
+            self._heap_size += len(heap)
+            offsets.update(new_offsets)
+        return records
+
+    def _append_records(self, records):
+        # Écrit à la fin des enregistrements complets, par-dessus un éventuel reste tronqué.
+        self._records.seek(HEADER_SIZE + self._count * RECORD.itemsize)
+        self._records.write(records.tobytes())
+        self._records.flush()
+        os.fsync(self._records.fileno())
+        self._count += len(records)
+
+    def append(self, rows):
+        with self._lock:
+            records = self._encode_records(rows)
+            if len(records):
+                self._append_records(records)
+
+    def replace(self, rows):
+        """Réécrit sur place l'enregistrement vivant de chaque ID de `rows`; les autres sont ajoutés."""
+        with self._lock:
+            records = self._encode_records(rows)
+            if not len(records):
+                return
+            current = self.records()
+            positions = np.flatnonzero(np.isin(current["id"], records["id"]) & (current["deleted"] == 0))
+            where = dict(zip(current["id"][positions].tolist(), positions.tolist()))
+            missing = []
+            for index, key in enumerate(records["id"].tolist()):
+                position = where.get(key)
+                if position is None:
+                    missing.append(index)
+                    continue
+                # Un enregistrement tient en une écriture de RECORD.itemsize octets.
+                self._records.seek(HEADER_SIZE + position * RECORD.itemsize)
+                self._records.write(records[index:index + 1].tobytes())
+            self._records.flush()
+            os.fsync(self._records.fileno())
+            if missing:
+                self._append_records(records[missing])
+
+    def remove(self, expense_ids):
+        keys = np.array([_id_bytes(expense_id) for expense_id in expense_ids], dtype="S16")
+        with self._lock:
+            records = self.records()
+            matches = np.isin(records["id"], keys) & (records["deleted"] == 0)
+            for position in np.flatnonzero(matches).tolist():
+                self._records.seek(HEADER_SIZE + position * RECORD.itemsize + _DELETED_OFFSET)
+                self._records.write(b"\x01")
+            self._records.flush()
+
+    def sync(self):
+        # Les suppressions ne sont que vidées vers le système: elles sont
+        # synchronisées ici, avec le tas, à la fin de chaque lot d'écritures.
+        with self._lock:
+            for file in (self._heap, self._records):
+                file.flush()
+                os.fsync(file.fileno())
+
+    def rewrite(self, rows, chunk_size=5000):
+        """Remplace le contenu par `rows` (itérable), sans les enregistrements supprimés."""
+        tmp_path = self.path + ".tmp"
+        for name in (tmp_path, heap_path(tmp_path)):
+            if os.path.exists(name):
+                os.remove(name)
+        # Chaque ajout synchronise le tas et les enregistrements temporaires:
+        # ils sont complets sur disque avant le premier os.replace.
+        ledger = BinaryLedger(tmp_path)
+        try:
+            rows = iter(rows)
+            while True:
+                chunk = [row for _, row in zip(range(chunk_size), rows)]
+                if not chunk:
+                    break
+                ledger.append(chunk)
+        finally:
+            ledger.close()
+        with self._lock:
+            self.close()
+            # Le tas d'abord: si l'arrêt survient entre les deux, les jetons diffèrent
+            # et _open termine le remplacement avec depenses.bin.tmp.
+            os.replace(heap_path(tmp_path), heap_path(self.path))
+            os.replace(tmp_path, self.path)
+            self._open()
+
+    def close(self):
+        # Les projections sont libérées avec les dernières vues qui les utilisent.
+        self._map = self._heap_map = None
+        self._records.close()
+        self._heap.close()
+
+
+class MappedColumns:
+    """Colonnes d'un registre binaire sans copie, pour ExpenseManager.attach.
+
+    Instantané des enregistrements, supprimés compris, à sa création:
+    `ordinals` et `cents` sont des vues sur la projection, `codes` et `alive`
+    des copies. Les ID sont formatés à la demande puis gardés, les
+    descriptions décodées à chaque lecture. Les projections restent valides
+    après la fermeture ou le remplacement du registre.
+    """
+
+    def __init__(self, records, heap):
+        self._records = records
+        self._heap = heap
+        self.ordinals = records["date"]
+        self.cents = records["cents"]
+        self.codes = records["category"].copy()
+        self.alive = records["deleted"] == 0
+        self._ids = [None] * len(records)
+        # (ordre, premiers 8 octets des ID triés), construit à la première recherche d'ID.
+        self._sorted = None
+
+    def __len__(self):
+        return len(self._records)
+
+    def id(self, position):
+        id = self._ids[position]
+        if id is None:
+            id = self._ids[position] = _format_ids(self._records["id"][position:position + 1])[0]
+        return id
+
+    def format_ids(self, start, stop):
+        # ID des positions [start, stop), formatés d'un bloc s'il en manque.
+        ids = self._ids
+        if None in ids[start:stop]:
+            ids[start:stop] = _format_ids(self._records["id"][start:stop])
+        return ids[start:stop]
+
+    def ids(self, positions):
+        """ID des `positions` (tableau NumPy croissant).
+
+        Peu nombreuses, elles sont formatées une à une; sinon par blocs de
+        FORMAT_CHUNK sur toute leur étendue.
+        """
+        if len(positions) * 4 < len(self):
+            return [self.id(position) for position in positions.tolist()]
+        if len(positions):
+            first = int(positions[0]) // FORMAT_CHUNK * FORMAT_CHUNK
+            for start in range(first, int(positions[-1]) + 1, FORMAT_CHUNK):
+                self.format_ids(start, min(start + FORMAT_CHUNK, len(self)))
+        ids = self._ids
+        return [ids[position] for position in positions.tolist()]
+
+    def positions(self, expense_id):
+        # Positions des enregistrements de `expense_id`, supprimés compris (un ID
+        # supprimé puis ajouté de nouveau en a plusieurs); [] si ce n'est pas un UUID.
+        try:
+            key = _id_bytes(expense_id)
+        except ValueError:
+            return []
+        if self._sorted is None:
+            # Clés en ordre natif: searchsorted convertirait sinon tout le tableau à chaque appel.
+            high = np.ndarray(len(self), dtype=">u8", buffer=self._records, strides=(RECORD.itemsize,)).astype(np.uint64)
+            order = np.argsort(high)
+            self._sorted = order, high[order]
+        order, keys = self._sorted
+        value = np.uint64(int.from_bytes(key[:8], "big"))
+        first, last = np.searchsorted(keys, value, "left"), np.searchsorted(keys, value, "right")
+        ids = self._records["id"]
+        return [position for position in order[first:last].tolist() if ids[position:position + 1].tobytes() == key]
+
+    def description(self, position):
+        return self.descriptions(slice(position, position + 1))[0]
+
+    def descriptions(self, positions):
+        # Descriptions des `positions` (tableau ou tranche).
+        return _descriptions(self._heap, self._records[positions])
+
+
+class BinaryRepository(ExpenseRepository):
+    supports_columns = True
+
+    def __init__(self, path, income_filename):
+        self.ledger = BinaryLedger(path)
+        self.income_filename = income_filename
+
+    def iter_chunks(self, chunk_size=5000):
+        return self.ledger.iter_rows(chunk_size)
+
+    def iter_columns(self, chunk_size=50_000):
+        return self.ledger.iter_columns(chunk_size)
+
+    def mapped(self):
+        return self.ledger.mapped()
+
+    def save(self, rows):
+        self.ledger.rewrite(rows)
+
+    def add(self, row):
+        self.ledger.append([row])
+
+    def add_many(self, rows):
+        self.ledger.append(list(rows))
+
+    def remove(self, expense_id):
+        self.ledger.remove([expense_id])
+
+    def remove_many(self, expense_ids):
+        self.ledger.remove(list(expense_ids))
+
+    def replace_many(self, rows):
+        self.ledger.replace(list(rows))
+
+    def read_income(self):
+        if not os.path.exists(self.income_filename):
+            return None
+        with open(self.income_filename, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write_income(self, text):
+        with open(self.income_filename, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def sync(self):
+        self.ledger.sync()
+        _sync_files(self.income_filename)
+
+    def files(self):
+        return [self.ledger.path, heap_path(self.ledger.path)]
+
+    def close(self):
+        self.ledger.close()
+
+
+def csv_to_ledger(csv_filename, path):
+    """Convertit un journal depenses.csv en registre binaire `path` (remplacé).
+
+    Les lignes refusées (mêmes règles qu'import_csv, ID non UUID compris) et
+    les ID en double sont ignorées. Renvoie (converties, ignorées).
+    """
+    counts = [0, 0]
+    seen = set()
+
+    def valid_rows():
+        for rows in CsvRepository(csv_filename, None).iter_chunks():
+            for row in rows:
+                try:
+                    expense = expense_from_row(row)
+                    _id_bytes(expense.id)
+                    if expense.id in seen:
+                        raise ValueError("ID dupliqué")
+                except ValueError:
+                    counts[1] += 1
+                    continue
+                seen.add(expense.id)
+                counts[0] += 1
+                yield expense.to_row()
+
+    ledger = BinaryLedger(path)
+    try:
+        ledger.rewrite(valid_rows())
+    finally:
+        ledger.close()
+    return tuple(counts)
+
+
+def ledger_to_csv(path, csv_filename):
+    """Réécrit le registre binaire `path` en journal depenses.csv. Renvoie le nombre de dépenses."""
+    ledger = BinaryLedger(path)
+    try:
+        CsvRepository(csv_filename, None).save(row for rows in ledger.iter_rows() for row in rows)
+        return len(ledger)
+    finally:
+        ledger.close()
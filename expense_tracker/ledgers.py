@@ -0,0 +1,307 @@
+"""Plusieurs registres de dépenses nommés dans un même processus.
+
+Chaque registre nommé a son dossier dans LEDGERS_DIRECTORY et son propre
+stockage; DEFAULT_LEDGER garde les fichiers du dossier courant. Un registre
+n'est chargé qu'à son ouverture, avec son ExpenseManager et son
+PersistenceWorker, et `evict_idle` libère ceux qui n'ont pas servi depuis
+IDLE_TIMEOUT. L'interface les libère hors de sa boucle: `detach` les retire
+des registres ouverts, `release` les ferme ensuite sur un autre thread.
+
+À la fermeture d'un registre, ses totaux mensuels par catégorie sont écrits
+dans SUMMARY_FILENAME avec la taille et la date de ses fichiers de dépenses.
+La vue consolidée additionne ces résumés sans relire les dépenses; un registre
+fermé n'est rechargé que si ses fichiers ont changé depuis son résumé.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .models import Aggregate, ExpenseManager
+from .persistence import PersistenceWorker
+from .storage import load_manager, open_repository
+
+LEDGERS_DIRECTORY = os.environ.get("DEPENSES_REGISTRES", "registres")
+DEFAULT_LEDGER = "Principal"
+SUMMARY_FILENAME = "resume-mensuel.json"
+
+# Inactivité (s) après laquelle un registre ouvert peut être libéré.
+IDLE_TIMEOUT = 600
+# Attente maximale (s) des écritures d'un registre avant de le libérer.
+CLOSE_TIMEOUT = 10
+
+CONSOLIDATED_GROUPINGS = ("ledger", "month", "category")
+
+
+def _signature(paths):
+    # (nom, taille, date) des fichiers existants: change à chaque écriture.
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def _check_groupings(by):
+    unknown = [grouping for grouping in by if grouping not in CONSOLIDATED_GROUPINGS]
+    if unknown:
+        raise ValueError(f"Regroupement inconnu: {', '.join(unknown)}")
+
+
+def consolidate(summaries, by=("month",), start=None, end=None):
+    """Totaux de `summaries` ({registre: totaux mensuels de LedgerSet.summary}) regroupés selon `by`.
+
+    `by` combine les regroupements de CONSOLIDATED_GROUPINGS; `start` et
+    `end` sont des (année, mois) inclus. Résultats triés par clé.
+    """
+    _check_groupings(by)
+    sums = {}
+    for name, summary in summaries.items():
+        for (year, month), totals in summary.items():
+            if start is not None and (year, month) < tuple(start) or end is not None and (year, month) > tuple(end):
+                continue
+            for category, (cents, count) in totals.items():
+                parts = {"ledger": name, "month": f"{year}-{month:02d}", "category": category}
+                entry = sums.setdefault(tuple(parts[grouping] for grouping in by), [0, 0])
+                entry[0] += cents
+                entry[1] += count
+    grand_total = sum(cents for cents, _ in sums.values())
+    return [Aggregate(key, cents / 100, count, cents / grand_total * 100 if grand_total else 0.0)
+            for key, (cents, count) in sorted(sums.items())]
+
+
+class Ledger:
+    """Registre ouvert: stockage, manager et écritures différées.
+
+    `complete` reste faux tant que le manager n'a pas reçu toutes les dépenses
+    (ouverture avec load=False, chargement fait par l'appelant). `income` est
+    le dernier revenu confié à `persistence`, que le stockage n'a peut-être
+    pas encore reçu; None si aucun depuis l'ouverture.
+    """
+
+    def __init__(self, name, repository, manager, persistence, complete):
+        self.name = name
+        self.repository = repository
+        self.manager = manager
+        self.persistence = persistence
+        self.complete = complete
+        self.income = None
+        self.last_used = None
+
+
+class LedgerSet:
+    def __init__(self, directory=LEDGERS_DIRECTORY, backend=None, idle_timeout=IDLE_TIMEOUT, clock=time.monotonic):
+        self.directory = directory
+        self.backend = backend
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._open = {}
+        # Nom -> Event des registres détachés dont la fermeture n'est pas finie.
+        self._releasing = {}
+
+    def location(self, name):
+        # Dossier des fichiers du registre; None pour le dossier courant.
+        return None if name == DEFAULT_LEDGER else os.path.join(self.directory, name)
+
+    def _summary_path(self, name):
+        return os.path.join(self.location(name) or "", SUMMARY_FILENAME)
+
+    def _wait_released(self, name, timeout=CLOSE_TIMEOUT):
+        # Un registre détaché doit finir de se fermer (écritures, compactage,
+        # résumé) avant d'être rouvert ou relu.
+        released = self._releasing.get(name)
+        if released is not None and not released.wait(timeout):
+            raise ValueError("Registre en cours de fermeture")
+
+    def names(self):
+        names = []
+        if os.path.isdir(self.directory):
+            names = sorted(entry.name for entry in os.scandir(self.directory)
+                           if entry.is_dir() and entry.name != DEFAULT_LEDGER)
+        return [DEFAULT_LEDGER, *names]
+
+    def create(self, name):
+        name = name.strip()
+        if not name or name in (".", "..") or any(sep and sep in name for sep in (os.sep, os.altsep)):
+            raise ValueError("Nom de registre invalide")
+        if name in self.names():
+            raise ValueError("Registre existant")
+        os.makedirs(self.location(name))
+        return name
+
+    def is_open(self, name):
+        return name in self._open
+
+    def get(self, name):
+        # Registre ouvert `name`, ou None; contrairement à open, ne l'ouvre pas.
+        return self._open.get(name)
+
+    def open(self, name, load=True):
+        """Registre `name`, chargé s'il ne l'est pas encore.
+
+        Avec load=False, un registre pas encore ouvert l'est avec un manager
+        vide: l'appelant le remplit puis met `complete` à vrai. Un registre
+        encore en cours de libération est attendu au plus CLOSE_TIMEOUT, puis
+        ValueError("Registre en cours de fermeture").
+        """
+        ledger = self._open.get(name)
+        if ledger is None:
+            if name not in self.names():
+                raise ValueError("Registre non trouvé")
+            self._wait_released(name)
+            repository = open_repository(self.backend, self.location(name))
+            # Les écritures passent par le thread de persistance: le manager
+            # calcule seul les totaux, même avec SQLite.
+            manager = ExpenseManager()
+            if load:
+                load_manager(repository, manager)
+            ledger = self._open[name] = Ledger(name, repository, manager, PersistenceWorker(repository), load)
+        ledger.last_used = self.clock()
+        return ledger
+
+    def close(self, name, timeout=CLOSE_TIMEOUT):
+        """Écrit les modifications en attente et libère le registre; False s'il en reste."""
+        ledger = self._open.get(name)
+        if ledger is None:
+            return True
+        if not ledger.persistence.close(timeout):
+            return False
+        del self._open[name]
+        self._finish(ledger)
+        return True
+
+    def close_all(self, timeout=CLOSE_TIMEOUT):
+        # Noms des registres qui n'ont pas pu être fermés; attend aussi les registres détachés.
+        remaining = [name for name in list(self._open) if not self.close(name, timeout)]
+        for released in list(self._releasing.values()):
+            released.wait(timeout)
+        return remaining
+
+    def idle(self, keep=()):
+        """Registres inactifs depuis idle_timeout, hors `keep`, que l'on peut libérer sans attendre.
+
+        Un registre incomplet est en cours de chargement, un registre avec des
+        écritures en attente, en cours ou en échec les termine: ils restent ouverts.
+        """
+        now = self.clock()
+        names = []
+        for name, ledger in self._open.items():
+            if name in keep or not ledger.complete or now - ledger.last_used < self.idle_timeout:
+                continue
+            status = ledger.persistence.status()
+            if not status.pending and not status.writing and status.error is None:
+                names.append(name)
+        return names
+
+    def detach(self, name):
+        """Retire le registre ouvert `name` et le renvoie, à fermer avec `release`.
+
+        Un `open(name)` attend la fin de cette fermeture.
+        """
+        ledger = self._open.pop(name)
+        self._releasing[name] = threading.Event()
+        return ledger
+
+    def release(self, ledger):
+        """Ferme un registre détaché et écrit son résumé; appelable depuis n'importe quel thread.
+
+        Le stockage n'est fermé qu'une fois les écritures synchronisées: un
+        échec d'écriture est réessayé jusque-là.
+        """
+        try:
+            while not ledger.persistence.close():
+                pass
+            self._finish(ledger)
+        finally:
+            self._releasing.pop(ledger.name).set()
+
+    def evict_idle(self, keep=()):
+        """Ferme les registres renvoyés par `idle(keep)`. Renvoie leurs noms."""
+        names = self.idle(keep)
+        for name in names:
+            self.release(self.detach(name))
+        return names
+
+    def _finish(self, ledger):
+        # Worker fermé et registre retiré de _open: reste le stockage et le résumé.
+        ledger.repository.close()
+        if ledger.complete:
+            self._write_summary(ledger.name, ledger.manager.monthly_summary(), ledger.repository.files())
+
+    def _read_summary(self, name, files):
+        try:
+            with open(self._summary_path(name), "r", encoding="utf-8") as file:
+                stored = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if stored.get("signature") != _signature(files):
+            return None
+        summary = {}
+        for month, totals in stored["months"].items():
+            year, month = map(int, month.split("-"))
+            summary[(year, month)] = {category: tuple(entry) for category, entry in totals.items()}
+        return summary
+
+    def _write_summary(self, name, summary, files):
+        # Appelé stockage fermé: la signature est celle que lira _read_summary.
+        # Fichier temporaire unique: une libération et une vue consolidée
+        # peuvent écrire le même résumé en même temps.
+        path = self._summary_path(name)
+        stored = {"signature": _signature(files),
+                  "months": {f"{year}-{month:02d}": {category: list(entry) for category, entry in totals.items()}
+                             for (year, month), totals in sorted(summary.items())}}
+        descriptor, tmp_path = tempfile.mkstemp(prefix=SUMMARY_FILENAME + ".", suffix=".tmp",
+                                                dir=os.path.dirname(path) or ".")
+        try:
+            with open(descriptor, "w", encoding="utf-8") as file:
+                json.dump(stored, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def summary(self, name):
+        """Totaux mensuels du registre: (année, mois) -> {catégorie: (centimes, nombre)}.
+
+        Lus dans le manager si le registre est ouvert, sinon par `stored_summary`.
+        """
+        ledger = self._open.get(name)
+        if ledger is not None:
+            if not ledger.complete:
+                raise ValueError("Registre en cours de chargement")
+            return ledger.manager.monthly_summary()
+        return self.stored_summary(name)
+
+    def stored_summary(self, name):
+        """Totaux mensuels lus dans le résumé du registre, recalculé (chargement
+        temporaire) s'il manque ou est périmé.
+
+        Ne touche pas aux registres ouverts: peut tourner sur un autre thread.
+        """
+        if name not in self.names():
+            raise ValueError("Registre non trouvé")
+        self._wait_released(name)
+        # La signature se lit stockage fermé (SQLite supprime son -wal à la fermeture).
+        repository = open_repository(self.backend, self.location(name))
+        files = repository.files()
+        repository.close()
+        summary = self._read_summary(name, files)
+        if summary is None:
+            repository = open_repository(self.backend, self.location(name))
+            try:
+                summary = load_manager(repository, ExpenseManager()).monthly_summary()
+            finally:
+                repository.close()
+            self._write_summary(name, summary, files)
+        return summary
+
+    def consolidated(self, by=("month",), names=None, start=None, end=None):
+        """Totaux de plusieurs registres (tous par défaut), voir `consolidate`."""
+        # Regroupements vérifiés avant de lire les résumés.
+        _check_groupings(by)
+        return consolidate({name: self.summary(name) for name in names or self.names()}, by, start, end)
@@ -0,0 +1,701 @@
+from array import array
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+import calendar
+import sys
+
+from .instrumentation import timed
+
+categories = ["Alimentation", "Transport", "Eau et électricité", "Santé", "Loisirs", "Éducation"]
+
+class Expense:
+    __slots__ = ("amount", "category", "date", "id", "description")
+
+    def __init__(self, amount, category, date, id, description):
+        if amount <= 0:
+            raise ValueError("Le montant doit être positif")
+        if category not in categories:
+            raise ValueError("Catégorie non trouvée")
+        self.amount = amount
+        self.category = category
+        self.date = date
+        self.id = id
+        self.description = description
+
+    @classmethod
+    def _view(cls, amount, category, date, id, description):
+        # Vue construite à la demande depuis le stockage en colonnes, déjà validé.
+        expense = cls.__new__(cls)
+        expense.amount = amount
+        expense.category = category
+        expense.date = date
+        expense.id = id
+        expense.description = description
+        return expense
+
+    def to_dict(self):
+        return {
+            "amount": self.amount,
+            "category": self.category,
+            "date": self.date,
+            "id": self.id,
+            "description": self.description
+        }
+
+    def to_row(self):
+        return [self.id, self.date, self.category, f"{self.amount:.2f}", self.description]
+
+def expense_from_row(row):
+    # Ligne au format de save_expenses; ValueError si Expense ou la date la refusent.
+    exp_id, date_str, category, amount_str, description = row
+    try:
+        amount_float = float(amount_str)
+    except:
+        amount_float = 0.0
+    expense = Expense(amount_float, category, date_str, exp_id, description)
+    if _parse_date(date_str) is None:
+        raise ValueError("Date invalide")
+    return expense
+
+
+def expense_columns(expenses):
+    """Colonnes d'Expense déjà validées (ids, ordinaux, codes, centimes, descriptions),
+    au format d'ExpenseManager.add_columns."""
+    import numpy as np
+
+    codes = {category: code for code, category in enumerate(categories)}
+    count = len(expenses)
+    return ([expense.id for expense in expenses],
+            np.fromiter((_parse_date(expense.date).toordinal() for expense in expenses), dtype=np.int32, count=count),
+            np.fromiter((codes[expense.category] for expense in expenses), dtype=np.uint8, count=count),
+            np.fromiter((round(expense.amount * 100) for expense in expenses), dtype=np.int64, count=count),
+            [sys.intern(expense.description) for expense in expenses])
+
+
+class _Totals:
+    __slots__ = ("total", "count", "categories")
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+        self.categories = {}
+
+    def __eq__(self, other):
+        return (self.total, self.count, self.categories) == (other.total, other.count, other.categories)
+
+    def copy(self):
+        totals = _Totals()
+        totals.total = self.total
+        totals.count = self.count
+        totals.categories = {category: entry[:] for category, entry in self.categories.items()}
+        return totals
+
+    def add(self, category, cents, sign):
+        self.total += sign * cents
+        self.count += sign
+        entry = self.categories.setdefault(category, [0, 0])
+        entry[0] += sign * cents
+        entry[1] += sign
+        if entry[1] == 0:
+            del self.categories[category]
+
+    def merge(self, category, cents, count):
+        # Ajoute d'un coup `count` dépenses d'une catégorie totalisant `cents`.
+        self.total += cents
+        self.count += count
+        entry = self.categories.setdefault(category, [0, 0])
+        entry[0] += cents
+        entry[1] += count
+
+    def aggregates(self, codes):
+        # Aggregate par catégorie, dans l'ordre des `codes` comme aggregation.aggregate.
+        return [Aggregate((category,), cents / 100, count, cents / self.total * 100 if self.total else 0.0)
+                for category, (cents, count) in sorted(self.categories.items(), key=lambda item: codes[item[0]])]
+
+
+def _parse_date(value):
+    try:
+        if len(value) == 10 and value[4] == "-":
+            return date.fromisoformat(value)
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+Aggregate = namedtuple("Aggregate", ["key", "total", "count", "percentage"])
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _to_ordinal(value):
+    if isinstance(value, str):
+        value = _parse_date(value)
+        if value is None:
+            raise ValueError("Date invalide")
+    return value.toordinal()
+
+
+def month_range(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "stale", "maxsize", "currsize"])
+
+# Nombre de résultats de statistiques gardés en cache par ExpenseManager.
+STATISTICS_CACHE_SIZE = 256
+
+
+class _StatisticsCache:
+    """Cache LRU des statistiques, clé (granularité, période, filtre catégorie).
+
+    Chaque entrée retient la génération à laquelle elle a été calculée; elle est
+    périmée si sa période a changé depuis.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.stale = 0
+
+    def get(self, key, changed):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < changed:
+            del self._entries[key]
+            self.stale += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, generation, value):
+        self._entries[key] = (generation, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.stale = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.stale, self.maxsize, len(self._entries))
+
+
+class ExpenseManager:
+    def __init__(self, repository=None):
+        # Stockage optionnel: s'il sait agréger (SQLite), les totaux y sont calculés.
+        self.repository = repository
+        # Stockage en colonnes: montants en centimes, dates en ordinaux et
+        # catégories en codes dans `categories`. Une suppression met l'id à
+        # None sans décaler les colonnes; les trous sont compactés quand ils
+        # dépassent la moitié des lignes.
+        self._ids = []
+        self._amounts = array("q")
+        self._dates = array("i")
+        self._categories = array("B")
+        self._descriptions = []
+        self._alive = bytearray()
+        self._positions = {}
+        self._holes = 0
+        # Colonnes projetées d'un registre binaire (voir attach), placées avant
+        # les lignes ci-dessus: une position p < _base_count les désigne, une
+        # position p au-delà la ligne p - _base_count des listes et tableaux.
+        # `_alive` et les positions de `_positions` couvrent les deux.
+        self._base = None
+        self._base_count = 0
+        self._base_codes = None
+        self._base_live = 0
+        self._total = 0
+        self._category_codes = {category: code for code, category in enumerate(categories)}
+        # Index incrémentaux: ordinal -> _Totals et (année, mois) -> _Totals.
+        self._daily = {}
+        self._monthly = {}
+        # Chaque ajout ou suppression incrémente la génération et la note pour
+        # son jour et son mois: seules ces statistiques en cache sont périmées.
+        self._generation = 0
+        self._changed = {}
+        self._statistics = _StatisticsCache(STATISTICS_CACHE_SIZE)
+        self._spending_index = None
+        # Index inversé des descriptions, construit à la première recherche
+        # ou par index_descriptions, puis tenu à jour.
+        self._search_index = None
+
+    @property
+    def expenses(self):
+        return list(self)
+
+    def _row(self, position):
+        # (ordinal, code catégorie, centimes) de la ligne `position`.
+        offset = position - self._base_count
+        if offset < 0:
+            return int(self._base.ordinals[position]), int(self._base_codes[position]), int(self._base.cents[position])
+        return self._dates[offset], self._categories[offset], self._amounts[offset]
+
+    def _id(self, position):
+        offset = position - self._base_count
+        return self._base.id(position) if offset < 0 else self._ids[offset]
+
+    def _description(self, position):
+        offset = position - self._base_count
+        return self._base.description(position) if offset < 0 else self._descriptions[offset]
+
+    def _position(self, id):
+        # Position de la dépense vivante `id`, ou None.
+        position = self._positions.get(id)
+        if position is None and self._base is not None:
+            position = next((position for position in self._base.positions(id) if self._alive[position]), None)
+        return position
+
+    def _view(self, position):
+        ordinal, code, cents = self._row(position)
+        return Expense._view(cents / 100, categories[code], date.fromordinal(ordinal).isoformat(),
+                             self._id(position), self._description(position))
+
+    def __iter__(self):
+        if self._base is not None:
+            import numpy as np
+
+            # Positions relevées d'avance: une vue sur `_alive` bloquerait les ajouts pendant l'itération.
+            positions = np.flatnonzero(np.frombuffer(self._alive, dtype=np.bool_)[:self._base_count]).tolist()
+            for position in positions:
+                yield self._view(position)
+        for offset, id in enumerate(self._ids):
+            if id is not None:
+                yield self._view(self._base_count + offset)
+
+    def __len__(self):
+        return len(self._positions) + self._base_live
+
+    def ids(self, base_stop=None):
+        # `base_stop` ne garde des lignes projetées que les base_stop premières
+        # (l'interface les liste au fur et à mesure de leur formatage).
+        ids = []
+        if self._base is not None:
+            import numpy as np
+
+            alive = np.frombuffer(self._alive, dtype=np.bool_)[:self._base_count]
+            ids = self._base.ids(np.flatnonzero(alive[:base_stop]))
+        ids.extend(id for id in self._ids if id is not None)
+        return ids
+
+    def live_ids(self, start, ids):
+        # Parmi `ids`, ID des lignes projetées start, start + 1, ..., celles encore vivantes.
+        alive = self._alive
+        return [id for position, id in enumerate(ids, start) if alive[position]]
+
+    def __contains__(self, id):
+        return self._position(id) is not None
+
+    def descriptions(self):
+        descriptions = []
+        if self._base is not None:
+            import numpy as np
+
+            alive = np.frombuffer(self._alive, dtype=np.bool_)[:self._base_count]
+            descriptions = self._base.descriptions(np.flatnonzero(alive))
+        descriptions.extend(description for description in self._descriptions if description is not None)
+        return descriptions
+
+    def snapshot(self):
+        # Copie indépendante, pour lire les dépenses depuis un autre thread.
+        copy = ExpenseManager()
+        copy._ids = self._ids[:]
+        copy._amounts = self._amounts[:]
+        copy._dates = self._dates[:]
+        copy._categories = self._categories[:]
+        copy._descriptions = self._descriptions[:]
+        copy._alive = self._alive[:]
+        copy._positions = self._positions.copy()
+        copy._holes = self._holes
+        copy._base = self._base
+        copy._base_count = self._base_count
+        copy._base_codes = None if self._base_codes is None else self._base_codes.copy()
+        copy._base_live = self._base_live
+        copy._total = self._total
+        copy._daily = {key: totals.copy() for key, totals in self._daily.items()}
+        copy._monthly = {key: totals.copy() for key, totals in self._monthly.items()}
+        return copy
+
+    def get_expense(self, id):
+        position = self._position(id)
+        if position is None:
+            raise ValueError("Dépense non trouvée")
+        return self._view(position)
+
+    def add_expense(self, expense):
+        if not isinstance(expense, Expense):
+            raise TypeError("Objet Expense attendu")
+        if expense.id in self:
+            raise ValueError("ID dupliqué")
+        day = _parse_date(expense.date)
+        if day is None:
+            raise ValueError("Date invalide")
+        ordinal = day.toordinal()
+        cents = round(expense.amount * 100)
+        position = self._base_count + len(self._ids)
+        self._positions[expense.id] = position
+        self._ids.append(expense.id)
+        self._amounts.append(cents)
+        self._dates.append(ordinal)
+        self._categories.append(self._category_codes[expense.category])
+        self._descriptions.append(sys.intern(expense.description))
+        self._alive.append(1)
+        if self._search_index is not None:
+            self._search_index.add(position, expense.description)
+        self._total += cents
+        self._index(self._daily, self._monthly, ordinal, expense.category, cents, 1)
+        self._touch(day)
+
+    def add_columns(self, ids, ordinals, codes, cents, descriptions, postings=None):
+        """Ajoute en bloc des dépenses déjà validées, par exemple lues dans un registre binaire.
+
+        `ordinals`, `codes` et `cents` sont des tableaux NumPy, `ids` et
+        `descriptions` des listes de chaînes de même longueur. `postings`,
+        calculé par search.build_postings(descriptions), évite de tokeniser
+        les descriptions ici quand l'index de recherche existe.
+        """
+        import numpy as np
+
+        start = self._base_count + len(self._ids)
+        positions = dict(zip(ids, range(start, start + len(ids))))
+        if len(positions) != len(ids) or not self._positions.keys().isdisjoint(positions):
+            raise ValueError("ID dupliqué")
+        if self._base is not None and any(self._position(id) is not None for id in ids):
+            raise ValueError("ID dupliqué")
+        self._positions.update(positions)
+        self._ids.extend(ids)
+        self._amounts.frombytes(np.ascontiguousarray(cents, dtype=np.int64).tobytes())
+        self._dates.frombytes(np.ascontiguousarray(ordinals, dtype=np.int32).tobytes())
+        self._categories.frombytes(np.ascontiguousarray(codes, dtype=np.uint8).tobytes())
+        self._descriptions.extend(descriptions)
+        self._alive.extend(b"\x01" * len(ids))
+        if self._search_index is not None:
+            if postings is None:
+                self._search_index.add_many(start, descriptions)
+            else:
+                self._search_index.add_postings(start, postings)
+        self._merge(ordinals, codes, cents)
+
+    def attach(self, base):
+        """Prend les colonnes projetées d'un registre binaire (ledger.MappedColumns)
+        comme premières lignes du manager, qui doit être vide.
+
+        Rien n'est copié ligne à ligne: seuls les totaux et les index sont
+        calculés ici, en passes NumPy. ID et descriptions sont lus dans `base`
+        à la demande; les catégories modifiées vont dans une copie des codes.
+        """
+        import numpy as np
+
+        if self._base is not None or self._ids:
+            raise ValueError("Manager non vide")
+        alive = base.alive
+        self._base = base
+        self._base_count = len(alive)
+        self._base_codes = base.codes.copy()
+        self._base_live = int(np.count_nonzero(alive))
+        self._alive = bytearray(alive.tobytes())
+        self._merge(base.ordinals[alive], self._base_codes[alive], base.cents[alive])
+
+    def _merge(self, ordinals, codes, cents):
+        # Ajoute des colonnes NumPy au total et aux index, par (jour, catégorie)
+        # plutôt que par dépense.
+        import numpy as np
+
+        if not len(cents):
+            return
+        cents = np.asarray(cents, dtype=np.int64)
+        self._total += int(cents.sum())
+        keys, inverse = np.unique(np.asarray(ordinals, dtype=np.int64) * 256 + codes, return_inverse=True)
+        sums = np.bincount(inverse, weights=cents)
+        counts = np.bincount(inverse)
+        for key, group_cents, count in zip(keys.tolist(), sums.tolist(), counts.tolist()):
+            ordinal, category = key >> 8, categories[key & 255]
+            day = date.fromordinal(ordinal)
+            for index, index_key in ((self._daily, ordinal), (self._monthly, (day.year, day.month))):
+                totals = index.get(index_key)
+                if totals is None:
+                    totals = index[index_key] = _Totals()
+                totals.merge(category, round(group_cents), count)
+            self._touch(day)
+
+    def remove_expense(self, id):
+        position = self._position(id)
+        if position is None:
+            raise ValueError("Dépense non trouvée")
+        self._remove(position)
+        if self._holes > 64 and self._holes * 2 > len(self._ids):
+            self._compact()
+
+    def remove_expenses(self, ids):
+        # Tout ou rien: aucune suppression si un ID est inconnu.
+        positions = [self._position(id) for id in dict.fromkeys(ids)]
+        if None in positions:
+            raise ValueError("Dépense non trouvée")
+        for position in positions:
+            self._remove(position)
+        if self._holes > 64 and self._holes * 2 > len(self._ids):
+            self._compact()
+
+    def _remove(self, position):
+        ordinal, code, cents = self._row(position)
+        self._index(self._daily, self._monthly, ordinal, categories[code], cents, -1)
+        self._touch(date.fromordinal(ordinal))
+        self._total -= cents
+        self._alive[position] = 0
+        offset = position - self._base_count
+        if offset < 0:
+            # Ligne projetée: seul le masque la retire, sans trou à compacter.
+            self._base_live -= 1
+            return
+        del self._positions[self._ids[offset]]
+        self._ids[offset] = None
+        self._descriptions[offset] = None
+        self._holes += 1
+
+    def recategorize(self, ids, category):
+        """Passe les dépenses `ids` dans `category`, tout ou rien.
+
+        Renvoie les ID réellement modifiés (ceux qui étaient dans une autre catégorie).
+        """
+        code = self._category_codes.get(category)
+        if code is None:
+            raise ValueError("Catégorie non trouvée")
+        ids = list(dict.fromkeys(ids))
+        positions = [self._position(id) for id in ids]
+        if None in positions:
+            raise ValueError("Dépense non trouvée")
+        changed = []
+        for id, position in zip(ids, positions):
+            ordinal, old_code, cents = self._row(position)
+            if old_code == code:
+                continue
+            self._index(self._daily, self._monthly, ordinal, categories[old_code], cents, -1)
+            self._index(self._daily, self._monthly, ordinal, category, cents, 1)
+            offset = position - self._base_count
+            if offset < 0:
+                self._base_codes[position] = code
+            else:
+                self._categories[offset] = code
+            self._touch(date.fromordinal(ordinal))
+            changed.append(id)
+        return changed
+
+    def _touch(self, day):
+        self._generation += 1
+        self._changed[("day", day.toordinal())] = self._generation
+        self._changed[("month", (day.year, day.month))] = self._generation
+
+    def _compact(self):
+        import numpy as np
+
+        # Seules les lignes ajoutées sont compactées; les lignes projetées gardent leurs positions.
+        base_count = self._base_count
+        live = [position for position, id in enumerate(self._ids) if id is not None]
+        if self._search_index is not None:
+            # Les positions changent: l'index est renuméroté plutôt que reconstruit.
+            positions = np.arange(base_count + len(self._ids), dtype=np.int32)
+            positions[base_count:] = -1
+            positions[base_count + np.array(live, dtype=np.intp)] = np.arange(base_count, base_count + len(live),
+                                                                              dtype=np.int32)
+            self._search_index.remap(positions)
+        self._ids = [self._ids[position] for position in live]
+        self._amounts = array("q", (self._amounts[position] for position in live))
+        self._dates = array("i", (self._dates[position] for position in live))
+        self._categories = array("B", (self._categories[position] for position in live))
+        self._descriptions = [self._descriptions[position] for position in live]
+        self._alive = self._alive[:base_count] + b"\x01" * len(live)
+        self._positions = {id: position for position, id in enumerate(self._ids, base_count)}
+        self._holes = 0
+
+    def _all_columns(self):
+        import numpy as np
+
+        # Colonnes (ordinaux, codes catégorie, centimes) de toutes les positions,
+        # supprimées comprises. Sans lignes projetées ce sont des vues sur les
+        # tableaux: à relâcher avant tout agrandissement.
+        columns = (np.frombuffer(self._dates, dtype=np.int32),
+                   np.frombuffer(self._categories, dtype=np.uint8),
+                   np.frombuffer(self._amounts, dtype=np.int64))
+        if self._base is None:
+            return columns
+        base = (self._base.ordinals, self._base_codes, self._base.cents)
+        return tuple(np.concatenate(pair) for pair in zip(base, columns))
+
+    def columns(self):
+        import numpy as np
+
+        # Copies NumPy des colonnes vivantes (ordinaux, codes catégorie, centimes).
+        alive = np.frombuffer(self._alive, dtype=np.bool_)
+        return tuple(column[alive] for column in self._all_columns())
+
+    @staticmethod
+    def _index(daily, monthly, ordinal, category, cents, sign):
+        day = date.fromordinal(ordinal)
+        for index, key in ((daily, ordinal), (monthly, (day.year, day.month))):
+            totals = index.get(key)
+            if totals is None:
+                totals = index[key] = _Totals()
+            totals.add(category, cents, sign)
+            if totals.count == 0:
+                del index[key]
+
+    def _daily_totals(self, given_date):
+        day = _parse_date(given_date)
+        return self._daily.get(day.toordinal()) if day else None
+
+    def total(self):
+        # Total courant, ajusté à chaque ajout et suppression.
+        return self._total / 100
+
+    def _aggregates_in_storage(self):
+        return self.repository is not None and self.repository.supports_aggregates
+
+    @timed("manager.daily_total")
+    def daily_total(self, given_date):
+        if self._aggregates_in_storage():
+            return self.repository.daily_total(given_date)
+        totals = self._daily_totals(given_date)
+        return totals.total / 100 if totals else 0
+
+    @timed("manager.monthly_total")
+    def monthly_total(self, year, month):
+        if self._aggregates_in_storage():
+            return self.repository.monthly_total(year, month)
+        totals = self._monthly.get((year, month))
+        return totals.total / 100 if totals else 0
+
+    @staticmethod
+    def _period(start, end):
+        # ("day", ordinal) ou ("month", (année, mois)) si [start, end] couvre
+        # exactement un jour ou un mois, sinon None (pas de cache).
+        first, last = _to_ordinal(start), _to_ordinal(end)
+        if first == last:
+            return "day", first
+        day = date.fromordinal(first)
+        if day.day == 1 and last == month_range(day.year, day.month)[1].toordinal():
+            return "month", (day.year, day.month)
+        return None
+
+    @timed("manager.category_totals")
+    def category_totals(self, start, end, category=None):
+        # Totaux par catégorie sur [start, end]; `category` n'en garde qu'une.
+        if self._aggregates_in_storage():
+            results = self.repository.category_totals(start, end)
+            return [result for result in results if category is None or result.key == (category,)]
+        period = self._period(start, end)
+        if period is not None:
+            key = (*period, category)
+            results = self._statistics.get(key, self._changed.get(period, 0))
+            if results is not None:
+                return list(results)
+            # Un jour ou un mois exact se lit dans son index incrémental.
+            kind, value = period
+            totals = (self._daily if kind == "day" else self._monthly).get(value)
+            results = totals.aggregates(self._category_codes) if totals else []
+        else:
+            from .aggregation import aggregate
+
+            results = aggregate(self, by=("category",), start=start, end=end)
+        if category is not None:
+            results = [result for result in results if result.key == (category,)]
+        if period is not None:
+            self._statistics.put(key, self._generation, results)
+        return list(results)
+
+    def monthly_summary(self):
+        # (année, mois) -> {catégorie: (centimes, nombre)}, copié depuis l'index mensuel.
+        return {key: {category: tuple(entry) for category, entry in totals.categories.items()}
+                for key, totals in self._monthly.items()}
+
+    def spending_index(self):
+        # Sommes préfixes pour les analyses par plage, reconstruites après une modification.
+        if self._spending_index is None or self._spending_index[0] != self._generation:
+            from .analytics import SpendingIndex
+
+            self._spending_index = (self._generation, SpendingIndex(self._daily))
+        return self._spending_index[1]
+
+    def index_descriptions(self, base=True):
+        # Crée l'index de recherche s'il n'existe pas; il suit ensuite chaque ajout
+        # et compactage. L'interface l'appelle avant de charger un registre, avec
+        # base=False pour passer les lignes projetées par paquets à index_postings.
+        if self._search_index is None:
+            from .search import DescriptionIndex
+
+            self._search_index = DescriptionIndex()
+            if base and self._base is not None:
+                self._search_index.add_many(0, self._base.descriptions(slice(None)))
+            self._search_index.add_many(self._base_count, self._descriptions)
+
+    def index_postings(self, start, postings):
+        # Ajoute à l'index les lignes projetées décrites par `postings` (search.build_postings).
+        if self._search_index is not None:
+            self._search_index.add_postings(start, postings)
+
+    @timed("manager.search")
+    def search(self, text="", category=None, min_amount=None, max_amount=None, start=None, end=None):
+        """ID des dépenses correspondant à tous les critères donnés, dans l'ordre d'insertion.
+
+        Chaque mot de `text` doit commencer un mot de la description (sans
+        tenir compte des accents ni de la casse); montants et dates sont inclus.
+        """
+        import numpy as np
+
+        self.index_descriptions()
+        positions = self._search_index.candidates(text, len(self._alive))
+        # Vues temporaires: relâchées avant tout agrandissement des colonnes.
+        alive = np.frombuffer(self._alive, dtype=np.bool_)
+        if positions is None:
+            mask = alive.copy()
+        else:
+            mask = alive[positions]
+        # Filtres (colonne de _all_columns, comparaison, valeur).
+        filters = []
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                raise ValueError("Catégorie non trouvée")
+            filters.append((1, np.equal, code))
+        if min_amount is not None:
+            filters.append((2, np.greater_equal, round(min_amount * 100)))
+        if max_amount is not None:
+            filters.append((2, np.less_equal, round(max_amount * 100)))
+        if start is not None:
+            filters.append((0, np.greater_equal, _to_ordinal(start)))
+        if end is not None:
+            filters.append((0, np.less_equal, _to_ordinal(end)))
+        columns = self._all_columns() if filters else ()
+        for column, compare, value in filters:
+            column = columns[column]
+            mask &= compare(column if positions is None else column[positions], value)
+        positions = np.flatnonzero(mask) if positions is None else positions[mask]
+        # ID des lignes projetées puis des lignes ajoutées.
+        split = int(np.searchsorted(positions, self._base_count))
+        ids = self._base.ids(positions[:split]) if split else []
+        tail = self._ids
+        ids.extend(tail[offset] for offset in (positions[split:] - self._base_count).tolist())
+        return ids
+
+    def cache_info(self):
+        return self._statistics.info()
+
+    def cache_clear(self):
+        self._statistics.clear()
+
+    @timed("manager.rebuild_indexes")
+    def rebuild_indexes(self):
+        daily, monthly = {}, {}
+        for position, alive in enumerate(self._alive):
+            if alive:
+                ordinal, code, cents = self._row(position)
+                self._index(daily, monthly, ordinal, categories[code], cents, 1)
+        return daily, monthly
+
+    def check_indexes(self):
+        # Reconstruit les index depuis zéro et les compare aux index incrémentaux.
+        daily, monthly = self.rebuild_indexes()
+        total = sum(totals.total for totals in daily.values())
+        return self._daily == daily and self._monthly == monthly and self._total == total
@@ -0,0 +1,191 @@
+"""Écritures différées vers un ExpenseRepository, sur un thread dédié.
+
+Les modifications sont mises en file (journal d'écriture anticipée en mémoire)
+et rendues tout de suite à l'appelant. Le thread attend COALESCE_DELAY après la
+première modification d'une rafale puis l'écrit en une fois: ajouts et
+suppressions consécutifs deviennent un add_many / remove_many, une dépense
+ajoutée puis supprimée dans la même rafale n'atteint jamais le disque, et seul
+le dernier revenu est écrit. En cas d'erreur, la rafale est remise en tête de
+file et réessayée après RETRY_DELAY; une synchronisation qui échoue après des
+écritures réussies est réessayée de même. `flush` et `close` renvoient False
+si un essai échoue pendant qu'ils attendent.
+"""
+from collections import namedtuple
+import threading
+import time
+
+from .instrumentation import timed
+
+# Délai (s) pendant lequel une rafale de modifications est regroupée.
+COALESCE_DELAY = 0.05
+# Délai (s) avant de réessayer une écriture qui a échoué.
+RETRY_DELAY = 1.0
+
+PersistenceStatus = namedtuple("PersistenceStatus", ["pending", "writing", "flushes", "error"])
+
+
+def coalesce(operations):
+    """Regroupe des opérations (type, valeur) en lots, dans l'ordre. Renvoie (lots, revenu ou None)."""
+    batches = []
+    added = {}
+    income = None
+    for kind, value in operations:
+        if kind == "income":
+            income = value
+            continue
+        key = value if kind == "remove" else value[0]
+        rows = added.get(key)
+        if rows is not None and kind in ("remove", "replace"):
+            # Dépense pas encore écrite: on modifie (ou retire) son ajout en attente.
+            index = next(i for i, row in enumerate(rows) if row[0] == key)
+            if kind == "remove":
+                del rows[index]
+                del added[key]
+            else:
+                rows[index] = value
+            continue
+        if not batches or batches[-1][0] != kind:
+            batches.append((kind, []))
+        batches[-1][1].append(value)
+        if kind == "add":
+            added[key] = batches[-1][1]
+    return [(kind, items) for kind, items in batches if items], income
+
+
+class PersistenceWorker:
+    """File d'écriture vers `repository`, vidée par un thread d'arrière-plan.
+
+    Seul ce thread écrit dans le stockage tant que le worker est ouvert.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self._pending = []
+        self._writing = False
+        self._closing = False
+        self._waiting = 0
+        self._flushes = 0
+        # Écritures faites mais pas encore synchronisées (échec de sync ou d'un lot).
+        self._unsynced = False
+        self._failures = 0
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+        self._thread.start()
+
+    def _put(self, operations):
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("Enregistrement fermé")
+            self._pending.extend(operations)
+            self._condition.notify_all()
+
+    def add(self, row):
+        self._put([("add", row)])
+
+    def add_many(self, rows):
+        self._put([("add", row) for row in rows])
+
+    def remove(self, expense_id):
+        self._put([("remove", expense_id)])
+
+    def remove_many(self, expense_ids):
+        self._put([("remove", expense_id) for expense_id in expense_ids])
+
+    def replace_many(self, rows):
+        self._put([("replace", row) for row in rows])
+
+    def write_income(self, text):
+        self._put([("income", text)])
+
+    def status(self):
+        with self._condition:
+            return PersistenceStatus(len(self._pending), self._writing, self._flushes, self._error)
+
+    def flush(self, timeout=None):
+        """Attend que tout soit écrit et synchronisé.
+
+        False si `timeout` (s) expire avant, ou si un essai d'écriture échoue
+        entre-temps (l'erreur est dans status()).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._waiting += 1
+            self._condition.notify_all()
+            failures = self._failures
+            try:
+                while self._pending or self._writing or self._unsynced:
+                    if self._failures != failures:
+                        return False
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+            finally:
+                self._waiting -= 1
+
+    def close(self, timeout=None):
+        """Vide la file puis arrête le thread; False si des modifications restent en attente."""
+        if not self.flush(timeout):
+            return False
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._unsynced and not self._closing:
+                    self._condition.wait()
+                if not self._pending and not self._unsynced:
+                    return
+                # Laisse la rafale se terminer, sauf si quelqu'un attend le vidage.
+                deadline = time.monotonic() + COALESCE_DELAY
+                while not self._waiting and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                operations, self._pending = self._pending, []
+                self._writing = True
+            remaining, error = self._write(operations)
+            with self._condition:
+                self._writing = False
+                self._error = error
+                self._unsynced = error is not None
+                if error is None:
+                    self._flushes += 1
+                else:
+                    self._failures += 1
+                    self._pending[:0] = remaining
+                self._condition.notify_all()
+            if error is not None:
+                time.sleep(RETRY_DELAY)
+
+    @timed("persistence.flush")
+    def _write(self, operations):
+        # Renvoie (opérations non écrites, erreur): un lot déjà écrit n'est pas rejoué,
+        # seule la synchronisation l'est. Sans opérations, ne fait que synchroniser.
+        batches, income = coalesce(operations)
+        done = 0
+        try:
+            for kind, items in batches:
+                if kind == "add":
+                    self.repository.add_many(items)
+                elif kind == "remove":
+                    self.repository.remove_many(items)
+                else:
+                    self.repository.replace_many(items)
+                done += 1
+            if income is not None:
+                self.repository.write_income(income)
+            self.repository.sync()
+            return [], None
+        except Exception as e:
+            remaining = [(kind, item) for kind, items in batches[done:] for item in items]
+            if income is not None:
+                remaining.append(("income", income))
+            return remaining, e
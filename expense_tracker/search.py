@@ -0,0 +1,147 @@
+"""Index inversé des descriptions, pour la recherche de l'ExpenseManager.
+
+Chaque mot (sans accents, en minuscules) pointe vers les positions des lignes
+qui le contiennent, dans l'ordre d'insertion. Un mot de la requête correspond
+à tous les mots de l'index qui commencent par lui ("caf" trouve "café"); les
+mots de la requête se combinent en ET. Les lignes supprimées restent dans
+l'index jusqu'au compactage, qui renumérote les positions, et sont écartées
+par le masque `_alive`.
+
+`build_postings` tokenise un paquet de descriptions sans toucher à l'index:
+le chargement en arrière-plan le calcule sur son thread, et l'ajout à l'index
+(`add_postings`) ne fait plus que recopier des positions.
+"""
+from array import array
+from bisect import bisect_left
+import functools
+import re
+import unicodedata
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=65536)
+def _plain(word):
+    decomposed = unicodedata.normalize("NFKD", word)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _words(text):
+    if not text:
+        return ()
+    words = _WORD.findall(text.casefold())
+    if not text.isascii():
+        words = [word if word.isascii() else _plain(word) for word in words]
+    return tuple(dict.fromkeys(words))
+
+
+# Mots distincts d'un texte, sans accents et en minuscules. Les descriptions se
+# répètent beaucoup: le cache évite de retokeniser à chaque ajout.
+tokenize = functools.lru_cache(maxsize=8192)(_words)
+
+
+def build_postings(descriptions):
+    """Liste (mot, positions int32 croissantes à partir de 0) des `descriptions`."""
+    # Chaque description distincte n'est tokenisée qu'une fois; les positions
+    # sont ensuite réparties par mot avec NumPy.
+    distinct = {}
+    rows = np.fromiter((distinct.setdefault(description, len(distinct)) for description in descriptions),
+                       dtype=np.int64, count=len(descriptions))
+    vocabulary = {}
+    token_ids = []
+    offsets = [0]
+    for description in distinct:
+        token_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in _words(description))
+        offsets.append(len(token_ids))
+    if not token_ids:
+        return []
+    offsets = np.array(offsets, dtype=np.int64)
+    counts = np.diff(offsets)[rows]
+    positions = np.repeat(np.arange(len(rows), dtype=np.int32), counts)
+    firsts = np.repeat(offsets[rows] - (np.cumsum(counts) - counts), counts)
+    tokens = np.array(token_ids, dtype=np.int64)[firsts + np.arange(len(positions))]
+    # Tri stable: les positions restent croissantes pour chaque mot.
+    order = np.argsort(tokens, kind="stable")
+    tokens, positions = tokens[order], positions[order]
+    bounds = np.flatnonzero(np.diff(tokens)) + 1
+    words = list(vocabulary)
+    return [(words[token], group) for token, group in zip(tokens[np.r_[0, bounds]].tolist(), np.split(positions, bounds))]
+
+
+class DescriptionIndex:
+    """Mot -> positions (array('i') croissant); voir ExpenseManager.search."""
+
+    def __init__(self):
+        self._postings = {}
+        # Mots triés pour la recherche par préfixe, retriés seulement si de nouveaux mots sont apparus.
+        self._vocabulary = None
+
+    def add(self, position, description):
+        postings = self._postings
+        for token in tokenize(description):
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = array("i")
+                self._vocabulary = None
+            posting.append(position)
+
+    def add_many(self, start, descriptions):
+        self.add_postings(start, build_postings(descriptions))
+
+    def add_postings(self, start, postings):
+        # `postings` vient de build_postings; ses positions sont décalées de `start`.
+        for word, group in postings:
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = array("i")
+                self._vocabulary = None
+            posting.frombytes((group + np.int32(start)).tobytes())
+
+    def remap(self, positions):
+        """Renumérote après un compactage: `positions[ancienne]` est la nouvelle position, -1 si supprimée."""
+        for word, posting in list(self._postings.items()):
+            moved = positions[np.frombuffer(posting, dtype=np.int32)]
+            moved = moved[moved >= 0]
+            if len(moved):
+                self._postings[word] = array("i", moved.astype(np.int32).tobytes())
+            else:
+                del self._postings[word]
+                self._vocabulary = None
+
+    def _tokens(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        index = bisect_left(vocabulary, prefix)
+        while index < len(vocabulary) and vocabulary[index].startswith(prefix):
+            yield vocabulary[index]
+            index += 1
+
+    def candidates(self, text, size):
+        """Positions triées contenant tous les mots de `text` en préfixe, ou None si `text` est vide.
+
+        `size` est le nombre de lignes du manager (taille du masque d'union).
+        """
+        words = tokenize(text)
+        if not words:
+            return None
+        result = None
+        for word in words:
+            postings = [self._postings[token] for token in self._tokens(word)]
+            if not postings:
+                return np.empty(0, dtype=np.int64)
+            if len(postings) == 1:
+                # Copie: une vue bloquerait l'agrandissement de l'array.
+                positions = np.array(postings[0], dtype=np.int64)
+            else:
+                # Union de plusieurs mots par masque: pas de tri, O(lignes + positions).
+                mask = np.zeros(size, dtype=np.bool_)
+                for posting in postings:
+                    mask[np.frombuffer(posting, dtype=np.int32)] = True
+                positions = np.flatnonzero(mask)
+            result = positions if result is None else np.intersect1d(result, positions, assume_unique=True)
+            if not len(result):
+                break
+        return result
@@ -0,0 +1,555 @@
+from datetime import date
+from itertools import islice
+import csv
+import io
+import logging
+import os
+import sqlite3
+import threading
+
+from .instrumentation import timed
+from .models import Aggregate, ExpenseManager, _parse_date, _to_ordinal, categories, expense_from_row, month_range
+
+FILENAME = "depenses.csv"
+REVENU_FILENAME = "revenu.csv"
+DATABASE = "depenses.db"
+LEDGER = "depenses.bin"
+
+# "csv" (depenses.csv / revenu.csv), "sqlite" (depenses.db) ou "binary" (depenses.bin / revenu.csv).
+STORAGE_BACKEND = os.environ.get("DEPENSES_STORAGE", "csv")
+
+HEADER = ["ID", "Date", "Catégorie", "Montant", "Description"]
+
+# Le fichier CSV est un journal: chaque ajout est une ligne, chaque suppression
+# une ligne "tombstone" (ID seul, autres champs vides). Le compactage réécrit le
+# journal sans les tombstones une fois COMPACTION_THRESHOLD atteint; après un
+# échec, le seuil est relevé d'autant avant le prochain essai.
+COMPACTION_THRESHOLD = 500
+
+_log = logging.getLogger(__name__)
+
+
+def _is_tombstone(row):
+    return not any(row[1:5])
+
+
+def _journal_lines(file, size):
+    # Lignes du journal (fichier binaire) jusqu'à `size` octets: les lignes
+    # ajoutées pendant une lecture en arrière-plan sont ignorées.
+    read = 0
+    for raw in file:
+        if read >= size:
+            break
+        read += len(raw)
+        yield raw.decode("utf-8")
+
+
+def _scan_tombstones(lines):
+    # Numéros des lignes annulées par une tombstone postérieure, et nombre de tombstones.
+    positions = {}
+    dead = set()
+    tombstones = 0
+    reader = csv.reader(lines)
+    next(reader, None)
+    for line, row in enumerate(reader):
+        if not row or len(row) < 5:
+            continue
+        if _is_tombstone(row):
+            tombstones += 1
+            added_line = positions.pop(row[0], None)
+            if added_line is not None:
+                dead.add(added_line)
+            continue
+        positions[row[0]] = line
+    return dead, tombstones
+
+
+def _live_rows(lines, dead):
+    reader = csv.reader(lines)
+    next(reader, None)
+    for line, row in enumerate(reader):
+        if row and len(row) >= 5 and not _is_tombstone(row) and line not in dead:
+            yield row
+
+
+def _sync_files(*paths):
+    # Ouverts en écriture: sous Windows, os.fsync (FlushFileBuffers) échoue
+    # avec EBADF sur un descripteur en lecture seule.
+    for path in paths:
+        if path and os.path.exists(path):
+            with open(path, "r+b") as file:
+                os.fsync(file.fileno())
+
+
+def _write_rows(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+class ExpenseRepository:
+    """Stockage des dépenses et du revenu.
+
+    Les lignes ont le format de save_expenses: [ID, Date, Catégorie, Montant, Description].
+    Si `supports_aggregates` est vrai, ExpenseManager délègue les totaux au stockage.
+    Si `supports_columns` est vrai, iter_columns alimente ExpenseManager.add_columns
+    et `mapped` fournit les colonnes d'ExpenseManager.attach.
+    """
+
+    supports_aggregates = False
+    supports_columns = False
+
+    def iter_chunks(self, chunk_size=5000):
+        raise NotImplementedError
+
+    def iter_columns(self, chunk_size=50_000):
+        raise NotImplementedError
+
+    def mapped(self):
+        raise NotImplementedError
+
+    @timed("storage.load")
+    def load(self):
+        return [row for rows in self.iter_chunks() for row in rows]
+
+    def save(self, rows):
+        raise NotImplementedError
+
+    def add(self, row):
+        raise NotImplementedError
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def remove(self, expense_id):
+        raise NotImplementedError
+
+    def remove_many(self, expense_ids):
+        for expense_id in expense_ids:
+            self.remove(expense_id)
+
+    def replace_many(self, rows):
+        # Remplace les dépenses de même ID par `rows` (par exemple après un changement de catégorie).
+        for row in rows:
+            self.remove(row[0])
+            self.add(row)
+
+    def read_income(self):
+        raise NotImplementedError
+
+    def write_income(self, text):
+        raise NotImplementedError
+
+    def daily_total(self, given_date):
+        raise NotImplementedError
+
+    def monthly_total(self, year, month):
+        raise NotImplementedError
+
+    def category_totals(self, start, end):
+        raise NotImplementedError
+
+    def sync(self):
+        # Force sur disque les écritures déjà faites.
+        pass
+
+    def files(self):
+        # Fichiers des dépenses, pour détecter une modification faite ailleurs.
+        return []
+
+    def close(self):
+        pass
+
+
+class CsvRepository(ExpenseRepository):
+    def __init__(self, filename, income_filename):
+        self.filename = filename
+        self.income_filename = income_filename
+        self._lock = threading.Lock()
+        self._compaction_thread = None
+        self._compaction_threshold = COMPACTION_THRESHOLD
+        self._tombstones = 0
+        # Lectures en cours (iter_chunks): le compactage ne remplace pas le fichier sous elles.
+        self._readers = 0
+
+    def iter_chunks(self, chunk_size=5000):
+        # Rejoue le journal en deux passes et génère les lignes vivantes par paquets.
+        with self._lock:
+            if not os.path.exists(self.filename):
+                return
+            size = os.path.getsize(self.filename)
+            self._readers += 1
+            counted = self._tombstones
+        try:
+            with open(self.filename, "rb") as file:
+                dead, tombstones = _scan_tombstones(_journal_lines(file, size))
+                with self._lock:
+                    # Tombstones des `size` premiers octets, plus celles ajoutées depuis le début de la lecture.
+                    self._tombstones = max(0, tombstones + self._tombstones - counted)
+                file.seek(0)
+                rows = _live_rows(_journal_lines(file, size), dead)
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        return
+                    yield chunk
+        finally:
+            with self._lock:
+                self._readers -= 1
+
+    @timed("csv.save")
+    def save(self, rows):
+        with self._lock:
+            _write_rows(self.filename + ".tmp", rows)
+            os.replace(self.filename + ".tmp", self.filename)
+            self._tombstones = 0
+
+    def _append_rows(self, rows, tombstones=0):
+        # `tombstones` est compté sous le même verrou que le compactage, qui remet le compteur à jour.
+        text = io.StringIO(newline="")
+        csv.writer(text).writerows(rows)
+        data = text.getvalue().encode("utf-8")
+        with self._lock:
+            with open(self.filename, "a+b") as file:
+                end = file.seek(0, os.SEEK_END)
+                if end == 0:
+                    header = io.StringIO(newline="")
+                    csv.writer(header).writerow(HEADER)
+                    data = header.getvalue().encode("utf-8") + data
+                else:
+                    # Dernière ligne sans fin de ligne (ajout interrompu par un arrêt
+                    # brutal, fichier modifié à la main): terminée avant l'ajout pour
+                    # ne pas y coller la première nouvelle ligne.
+                    file.seek(end - 1)
+                    if file.read(1) != b"\n":
+                        data = b"\r\n" + data
+                file.write(data)
+            self._tombstones += tombstones
+
+    @timed("csv.add")
+    def add(self, row):
+        self._append_rows([row])
+
+    @timed("csv.add_many")
+    def add_many(self, rows):
+        self._append_rows(rows)
+
+    @timed("csv.remove")
+    def remove(self, expense_id):
+        self._append_rows([[expense_id, "", "", "", ""]], tombstones=1)
+        self._compact_if_needed()
+
+    @timed("csv.remove_many")
+    def remove_many(self, expense_ids):
+        tombstones = [[expense_id, "", "", "", ""] for expense_id in expense_ids]
+        self._append_rows(tombstones, tombstones=len(tombstones))
+        self._compact_if_needed()
+
+    @timed("csv.replace_many")
+    def replace_many(self, rows):
+        # Une tombstone puis la nouvelle ligne: le rejeu garde la dernière version.
+        rows = list(rows)
+        self._append_rows([line for row in rows for line in ([row[0], "", "", "", ""], row)], tombstones=len(rows))
+        self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        # Sans lecture en cours: sinon le prochain ajout de tombstones réessaie.
+        if self._tombstones >= self._compaction_threshold and not self._readers and not (
+                self._compaction_thread and self._compaction_thread.is_alive()):
+            self._compaction_thread = threading.Thread(target=self._compact_in_background, daemon=True)
+            self._compaction_thread.start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception:
+            _log.exception("Compactage de %s impossible", self.filename)
+            with self._lock:
+                self._compaction_threshold = self._tombstones + COMPACTION_THRESHOLD
+        else:
+            self._compaction_threshold = COMPACTION_THRESHOLD
+
+    @timed("csv.compact")
+    def compact(self):
+        """Réécrit le journal sans ses tombstones. Renvoie False si une lecture en cours l'en a empêché."""
+        with self._lock:
+            if not os.path.exists(self.filename) or self._readers:
+                return False
+            size = os.path.getsize(self.filename)
+
+        tmp_path = self.filename + ".tmp"
+        try:
+            with open(self.filename, "rb") as file:
+                dead, _ = _scan_tombstones(_journal_lines(file, size))
+                file.seek(0)
+                _write_rows(tmp_path, _live_rows(_journal_lines(file, size), dead))
+
+            # Les lignes ajoutées pendant la réécriture sont recopiées telles quelles
+            # avant le renommage, sous le verrou, pour ne rien perdre.
+            with self._lock:
+                if self._readers:
+                    os.remove(tmp_path)
+                    return False
+                with open(self.filename, "rb") as file:
+                    file.seek(size)
+                    tail = file.read()
+                with open(tmp_path, "ab") as file:
+                    file.write(tail)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.filename)
+                self._tombstones = sum(1 for row in csv.reader(io.StringIO(tail.decode("utf-8"), newline=""))
+                                       if row and len(row) >= 5 and _is_tombstone(row))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def read_income(self):
+        if not os.path.exists(self.income_filename):
+            return None
+        with open(self.income_filename, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write_income(self, text):
+        with open(self.income_filename, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def sync(self):
+        with self._lock:
+            _sync_files(self.filename, self.income_filename)
+
+    def files(self):
+        return [self.filename]
+
+    def close(self):
+        # Un compactage en cours doit finir avant que les fichiers soient relus ou déplacés.
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+
+
+class SqliteRepository(ExpenseRepository):
+    # Montants en centimes; l'index (date, category, amount_cents) couvre les
+    # agrégats par jour, mois et catégorie sans lire la table.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS expenses (
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            date TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            description TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS expenses_date ON expenses (date, category, amount_cents);
+        CREATE INDEX IF NOT EXISTS expenses_category ON expenses (category);
+        CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+    INSERT = "INSERT INTO expenses (id, date, category, amount_cents, description) VALUES (?, ?, ?, ?, ?)"
+    DELETE = "DELETE FROM expenses WHERE id = ?"
+    UPDATE = "UPDATE expenses SET date = ?, category = ?, amount_cents = ?, description = ? WHERE id = ?"
+    SELECT = "SELECT id, date, category, amount_cents, description FROM expenses ORDER BY seq"
+    SUM_RANGE = "SELECT COALESCE(SUM(amount_cents), 0) FROM expenses WHERE date BETWEEN ? AND ?"
+    CATEGORY_RANGE = ("SELECT category, SUM(amount_cents), COUNT(*) FROM expenses "
+                      "WHERE date BETWEEN ? AND ? GROUP BY category")
+    supports_aggregates = True
+
+    def __init__(self, path):
+        self.path = path
+        # sqlite3 garde les requêtes préparées en cache par texte SQL.
+        self.connection = self._connect()
+        with self.connection:
+            self.connection.executescript(self.SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @staticmethod
+    def _to_record(row):
+        exp_id, date_str, category, amount_str, description = row[:5]
+        day = _parse_date(date_str)
+        if day is None:
+            raise ValueError("Date invalide")
+        return exp_id, day.isoformat(), category, round(float(amount_str) * 100), description
+
+    def iter_chunks(self, chunk_size=5000):
+        # Connexion dédiée: le chargement tourne sur un thread pendant que
+        # l'interface continue d'écrire.
+        connection = self._connect()
+        try:
+            cursor = connection.execute(self.SELECT)
+            while True:
+                records = cursor.fetchmany(chunk_size)
+                if not records:
+                    return
+                yield [[exp_id, date_str, category, f"{cents / 100:.2f}", description]
+                       for exp_id, date_str, category, cents, description in records]
+        finally:
+            connection.close()
+
+    @timed("sqlite.save")
+    def save(self, rows):
+        with self.connection:
+            self.connection.execute("DELETE FROM expenses")
+            self.connection.executemany(self.INSERT, (self._to_record(row) for row in rows))
+
+    @timed("sqlite.add")
+    def add(self, row):
+        with self.connection:
+            self.connection.execute(self.INSERT, self._to_record(row))
+
+    @timed("sqlite.add_many")
+    def add_many(self, rows):
+        with self.connection:
+            self.connection.executemany(self.INSERT, (self._to_record(row) for row in rows))
+
+    @timed("sqlite.remove")
+    def remove(self, expense_id):
+        with self.connection:
+            self.connection.execute(self.DELETE, (expense_id,))
+
+    @timed("sqlite.remove_many")
+    def remove_many(self, expense_ids):
+        with self.connection:
+            self.connection.executemany(self.DELETE, ((expense_id,) for expense_id in expense_ids))
+
+    @timed("sqlite.replace_many")
+    def replace_many(self, rows):
+        records = [self._to_record(row) for row in rows]
+        with self.connection:
+            self.connection.executemany(self.UPDATE, (record[1:] + record[:1] for record in records))
+
+    def read_income(self):
+        record = self.connection.execute("SELECT value FROM settings WHERE key = 'revenu'").fetchone()
+        return record[0] if record else None
+
+    def write_income(self, text):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('revenu', ?)", (text,))
+
+    @timed("sqlite.sum")
+    def _sum(self, start, end):
+        return self.connection.execute(self.SUM_RANGE, (start.isoformat(), end.isoformat())).fetchone()[0] / 100
+
+    def daily_total(self, given_date):
+        day = _parse_date(given_date)
+        return self._sum(day, day) if day else 0
+
+    def monthly_total(self, year, month):
+        return self._sum(*month_range(year, month))
+
+    @timed("sqlite.category_totals")
+    def category_totals(self, start, end):
+        start, end = date.fromordinal(_to_ordinal(start)), date.fromordinal(_to_ordinal(end))
+        records = self.connection.execute(self.CATEGORY_RANGE, (start.isoformat(), end.isoformat())).fetchall()
+        records.sort(key=lambda record: categories.index(record[0]) if record[0] in categories else len(categories))
+        grand_total = sum(cents for _, cents, _ in records)
+        return [Aggregate((category,), cents / 100, count, cents / grand_total * 100 if grand_total else 0.0)
+                for category, cents, count in records]
+
+    def sync(self):
+        # En WAL avec synchronous=NORMAL, un point de contrôle complet rend les validations durables.
+        self.connection.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def files(self):
+        return [self.path, self.path + "-wal"]
+
+    def close(self):
+        self.connection.close()
+
+
+def import_csv(csv_filename, repository, income_filename=None, seen=None):
+    """Importe un journal depenses.csv (et revenu.csv) dans `repository`.
+
+    Le journal est lu par paquets mais écrit en un seul add_many: avec SQLite,
+    une seule transaction, et rien n'est importé si elle échoue. Les lignes
+    refusées par Expense (montant, catégorie ou date invalides) et les ID de
+    `seen` ou déjà importés sont ignorés. Renvoie (importées, ignorées).
+    """
+    seen = set() if seen is None else seen
+    counts = [0, 0]
+
+    def accepted_rows():
+        for rows in CsvRepository(csv_filename, None).iter_chunks():
+            for row in rows:
+                try:
+                    expense = expense_from_row(row)
+                    if expense.id in seen:
+                        raise ValueError("ID dupliqué")
+                except ValueError:
+                    counts[1] += 1
+                    continue
+                seen.add(expense.id)
+                counts[0] += 1
+                yield row
+
+    repository.add_many(accepted_rows())
+    if income_filename:
+        income = CsvRepository(csv_filename, income_filename).read_income()
+        if income is not None:
+            repository.write_income(income)
+    return tuple(counts)
+
+
+def load_manager(repository, manager=None):
+    # Charge tout le stockage dans `manager` (par défaut un ExpenseManager sur
+    # `repository`), paquet par paquet.
+    if manager is None:
+        manager = ExpenseManager(repository)
+    if repository.supports_columns:
+        # Colonnes projetées gardées telles quelles: ID et descriptions sont lus à la demande.
+        manager.attach(repository.mapped())
+        return manager
+    for rows in repository.iter_chunks():
+        for row in rows:
+            try:
+                manager.add_expense(expense_from_row(row))
+            except ValueError:
+                continue
+    return manager
+
+
+def open_repository(backend=None, directory=None):
+    # Fichiers dans `directory` s'il est donné (un registre nommé), sinon dans le dossier courant.
+    backend = backend or STORAGE_BACKEND
+    path = (lambda name: os.path.join(directory, name)) if directory else (lambda name: name)
+    if backend == "csv":
+        return CsvRepository(path(FILENAME), path(REVENU_FILENAME))
+    if backend == "sqlite":
+        return SqliteRepository(path(DATABASE))
+    if backend == "binary":
+        from .ledger import BinaryRepository
+
+        return BinaryRepository(path(LEDGER), path(REVENU_FILENAME))
+    raise ValueError(f"Stockage inconnu: {backend}")
+
+
+_repository = None
+
+
+def default_repository():
+    global _repository
+    if _repository is None:
+        _repository = open_repository()
+    return _repository
+
+
+@timed("save_expenses")
+def save_expenses(data):
+    default_repository().save(data)
+
+
+@timed("load_expenses")
+def load_expenses():
+    return default_repository().load()
+
+
+def iter_expenses(chunk_size=5000):
+    return default_repository().iter_chunks(chunk_size)
@@ -0,0 +1,128 @@
+"""Registre binaire: aller-retour, reprise après un arrêt brutal et colonnes projetées."""
+import os
+import random
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from expense_tracker import ExpenseManager, expense_from_row
+from expense_tracker import ledger as binary
+from expense_tracker.ledger import BinaryRepository
+from expense_tracker.storage import load_manager
+
+
+def row(rng, description=None):
+    return [str(uuid.UUID(int=rng.getrandbits(128), version=4)), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            rng.choice(["Alimentation", "Transport", "Santé"]), f"{rng.randint(1, 99999) / 100:.2f}",
+            rng.choice(["", "Café", "Loyer", "Électricité"]) if description is None else description]
+
+
+class BinaryLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "depenses.bin")
+        self.income = os.path.join(self.directory.name, "revenu.csv")
+        self.rng = random.Random(1)
+
+    def open(self):
+        repository = BinaryRepository(self.path, self.income)
+        self.addCleanup(repository.close)
+        return repository
+
+    def test_round_trip(self):
+        repository = self.open()
+        rows = [row(self.rng) for _ in range(50)]
+        repository.add_many(rows)
+        repository.remove_many([rows[0][0], rows[1][0]])
+        changed = rows[2][:2] + ["Loisirs"] + rows[2][3:]
+        repository.replace_many([changed])
+        repository.close()
+        self.assertEqual(self.open().load(), [changed] + rows[3:])
+
+    def test_truncated_record_is_ignored_then_overwritten(self):
+        repository = self.open()
+        rows = [row(self.rng) for _ in range(3)]
+        repository.add_many(rows)
+        repository.close()
+        # Arrêt brutal au milieu de l'écriture d'un enregistrement.
+        with open(self.path, "ab") as file:
+            file.write(b"\x07" * (binary.RECORD.itemsize // 2))
+        repository = self.open()
+        self.assertEqual(repository.load(), rows)
+        added = row(self.rng)
+        repository.add(added)
+        repository.close()
+        self.assertEqual(os.path.getsize(self.path), binary.HEADER_SIZE + 4 * binary.RECORD.itemsize)
+        self.assertEqual(self.open().load(), rows + [added])
+
+    def rewrite_interrupted(self, failing_call):
+        repository = self.open()
+        old = [row(self.rng) for _ in range(5)]
+        repository.add_many(old)
+        new = [row(self.rng, "Réécrit") for _ in range(3)]
+        replace = os.replace
+        calls = []
+
+        def crash(source, target):
+            calls.append(target)
+            if len(calls) == failing_call:
+                raise OSError("arrêt brutal")
+            replace(source, target)
+
+        with mock.patch.object(binary.os, "replace", crash):
+            with self.assertRaises(OSError):
+                repository.save(new)
+        return old, new
+
+    def test_rewrite_interrupted_before_heap_keeps_old_ledger(self):
+        old, _ = self.rewrite_interrupted(failing_call=1)
+        self.assertEqual(self.open().load(), old)
+
+    def test_rewrite_interrupted_between_replacements_is_completed(self):
+        # Tas déjà remplacé, enregistrements pas encore: les jetons diffèrent et
+        # l'ouverture termine le remplacement avec depenses.bin.tmp.
+        _, new = self.rewrite_interrupted(failing_call=2)
+        self.assertEqual(self.open().load(), new)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_mismatched_pair_without_temporary_file_is_refused(self):
+        self.rewrite_interrupted(failing_call=2)
+        os.remove(self.path + ".tmp")
+        with self.assertRaises(ValueError):
+            BinaryRepository(self.path, self.income)
+
+    def test_attached_manager_matches_plain_manager(self):
+        repository = self.open()
+        rows = [row(self.rng) for _ in range(300)]
+        repository.add_many(rows)
+        repository.remove_many([expense[0] for expense in rows[::7]])
+        plain = ExpenseManager()
+        for expense in rows:
+            if expense not in rows[::7]:
+                plain.add_expense(expense_from_row(expense))
+        attached = load_manager(repository, ExpenseManager())
+        for manager in (attached, plain):
+            manager.index_descriptions()
+        for step in range(400):
+            ids = plain.ids()
+            if self.rng.random() < 0.6:
+                expense_id = self.rng.choice(ids)
+                attached.remove_expense(expense_id)
+                plain.remove_expense(expense_id)
+            else:
+                added = row(self.rng)
+                attached.add_expense(expense_from_row(added))
+                plain.add_expense(expense_from_row(added))
+            if step % 100 == 99:
+                self.assertEqual(sorted(attached.ids()), sorted(plain.ids()))
+                self.assertEqual(attached.monthly_summary(), plain.monthly_summary())
+                self.assertEqual(sorted(attached.search("caf")), sorted(plain.search("caf")))
+                self.assertTrue(attached.check_indexes())
+        expense_id = self.rng.choice(plain.ids())
+        self.assertEqual(attached.get_expense(expense_id).to_dict(), plain.get_expense(expense_id).to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Journal depenses.csv: ajouts, tombstones et lignes interrompues."""
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from expense_tracker import ExpenseManager, expense_from_row, storage
+from expense_tracker.storage import HEADER, CsvRepository, load_manager
+
+
+def row(expense_id, amount="1.00", description=""):
+    return [expense_id, "2024-01-01", "Santé", amount, description]
+
+
+class CsvJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.filename = os.path.join(self.directory.name, "depenses.csv")
+        self.repository = CsvRepository(self.filename, os.path.join(self.directory.name, "revenu.csv"))
+        self.addCleanup(self.repository.close)
+
+    def write(self, data):
+        with open(self.filename, "wb") as file:
+            file.write(data)
+
+    def lines(self):
+        with open(self.filename, "rb") as file:
+            return file.read().decode("utf-8").splitlines()
+
+    def test_replay_keeps_last_version_of_each_live_row(self):
+        self.repository.add_many([row("a"), row("b"), row("c")])
+        self.repository.remove("b")
+        self.repository.replace_many([row("a", "9.00")])
+        self.repository.add(row("b", "2.00"))
+        expected = [row("c"), row("a", "9.00"), row("b", "2.00")]
+        self.assertEqual(self.repository.load(), expected)
+        # Un nouveau stockage rejoue le même journal.
+        self.assertEqual(CsvRepository(self.filename, None).load(), expected)
+        self.assertEqual(self.repository._tombstones, 2)
+
+    def test_compact_drops_tombstones(self):
+        self.repository.add_many([row(str(i)) for i in range(10)])
+        self.repository.remove_many([str(i) for i in range(0, 10, 2)])
+        before = self.repository.load()
+        self.assertTrue(self.repository.compact())
+        self.assertEqual(self.repository.load(), before)
+        self.assertEqual(len(self.lines()), 1 + len(before))
+        self.assertEqual(self.repository._tombstones, 0)
+        self.assertFalse(os.path.exists(self.filename + ".tmp"))
+
+    def test_compact_keeps_rows_appended_during_rewrite(self):
+        self.repository.add_many([row("a"), row("b")])
+        self.repository.remove("a")
+        write_rows = storage._write_rows
+
+        def write_then_append(path, rows):
+            write_rows(path, rows)
+            # Ajout et suppression pendant la réécriture, hors du verrou.
+            self.repository.add(row("c"))
+            self.repository.remove("b")
+
+        with mock.patch.object(storage, "_write_rows", write_then_append):
+            self.assertTrue(self.repository.compact())
+        self.assertEqual(self.repository.load(), [row("c")])
+        self.assertEqual(self.repository._tombstones, 1)
+
+    def test_interrupted_compaction_leaves_journal_intact(self):
+        self.repository.add_many([row("a"), row("b")])
+        self.repository.remove("a")
+        before = self.lines()
+        with mock.patch.object(storage.os, "replace", side_effect=OSError("arrêt")):
+            with self.assertRaises(OSError):
+                self.repository.compact()
+        self.assertEqual(self.lines(), before)
+        self.assertFalse(os.path.exists(self.filename + ".tmp"))
+        self.assertEqual(self.repository.load(), [row("b")])
+
+    def test_compact_waits_for_running_reads(self):
+        self.repository.add_many([row(str(i)) for i in range(10)])
+        self.repository.remove("0")
+        chunks = self.repository.iter_chunks(chunk_size=3)
+        first = next(chunks)
+        self.assertFalse(self.repository.compact())
+        rest = [expense for chunk in chunks for expense in chunk]
+        self.assertEqual(first + rest, [row(str(i)) for i in range(1, 10)])
+        self.assertTrue(self.repository.compact())
+
+    def test_background_compaction_after_threshold(self):
+        self.repository._compaction_threshold = 3
+        self.repository.add_many([row(str(i)) for i in range(5)])
+        self.repository.remove_many(["0", "1", "2"])
+        self.repository.close()
+        self.assertEqual(len(self.lines()), 3)
+        self.assertEqual(self.repository.load(), [row("3"), row("4")])
+
+    def test_compacted_journal_loads_like_plain_manager(self):
+        rng = random.Random(1)
+        manager = ExpenseManager()
+        for step in range(600):
+            ids = manager.ids()
+            if ids and rng.random() < 0.4:
+                expense_id = rng.choice(ids)
+                self.repository.remove(expense_id)
+                manager.remove_expense(expense_id)
+            else:
+                added = row(f"id-{step}", f"{rng.randint(1, 9999) / 100:.2f}", rng.choice(["", "café"]))
+                self.repository.add(added)
+                manager.add_expense(expense_from_row(added))
+            if step % 150 == 149:
+                self.assertTrue(self.repository.compact())
+                loaded = load_manager(self.repository, ExpenseManager())
+                self.assertEqual(loaded.ids(), manager.ids())
+                self.assertEqual(loaded.total(), manager.total())
+                self.assertEqual(loaded.monthly_summary(), manager.monthly_summary())
+
+    def test_append_after_line_without_terminator(self):
+        # Fichier modifié à la main, sans fin de ligne finale.
+        self.write(("\r\n".join([",".join(HEADER), "a,2024-01-01,Santé,5.00,x"])).encode("utf-8"))
+        self.repository.add(["b", "2024-01-02", "Santé", "3.00", "y"])
+        self.assertEqual(self.repository.load(), [["a", "2024-01-01", "Santé", "5.00", "x"],
+                                                  ["b", "2024-01-02", "Santé", "3.00", "y"]])
+
+    def test_append_after_torn_line(self):
+        # Arrêt brutal au milieu d'un ajout: la ligne tronquée reste seule et
+        # incomplète, l'ajout suivant est intact.
+        self.write((",".join(HEADER) + "\r\na,2024-01-01,Santé,5.00,x\r\nc,2024-0").encode("utf-8"))
+        self.repository.add_many([["b", "2024-01-02", "Santé", "3.00", "y"]])
+        self.repository.remove("a")
+        self.assertEqual(self.repository.load(), [["b", "2024-01-02", "Santé", "3.00", "y"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
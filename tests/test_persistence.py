@@ -0,0 +1,110 @@
+"""PersistenceWorker avec un faux stockage lent: l'appelant n'attend jamais l'écriture."""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from expense_tracker import persistence
+from expense_tracker.persistence import PersistenceWorker
+
+# Durée d'une écriture du faux stockage (s).
+WRITE_SECONDS = 0.2
+
+
+class SlowRepository:
+    """Stockage qui dort à chaque écriture et note les appels; `sync_failures` syncs échouent."""
+
+    def __init__(self, sync_failures=0):
+        self.calls = []
+        self.sync_failures = sync_failures
+        self.writing = threading.Event()
+
+    def _write(self, call):
+        self.writing.set()
+        time.sleep(WRITE_SECONDS)
+        self.calls.append(call)
+
+    def add_many(self, rows):
+        self._write(("add_many", [row[0] for row in rows]))
+
+    def remove_many(self, expense_ids):
+        self._write(("remove_many", list(expense_ids)))
+
+    def replace_many(self, rows):
+        self._write(("replace_many", [row[0] for row in rows]))
+
+    def write_income(self, text):
+        self._write(("write_income", text))
+
+    def sync(self):
+        if self.sync_failures:
+            self.sync_failures -= 1
+            raise OSError("disque absent")
+        self.calls.append(("sync",))
+
+
+def row(expense_id):
+    return [expense_id, "2024-01-01", "Santé", "1.00", ""]
+
+
+@mock.patch.object(persistence, "RETRY_DELAY", 0.05)
+class PersistenceWorkerTest(unittest.TestCase):
+    def worker(self, repository):
+        worker = PersistenceWorker(repository)
+        self.addCleanup(worker.close, 5)
+        return worker
+
+    def test_submit_does_not_wait_for_storage(self):
+        repository = SlowRepository()
+        worker = self.worker(repository)
+        worker.add(row("a"))
+        self.assertTrue(repository.writing.wait(1))
+        # Une écriture est en cours: les modifications suivantes sont seulement mises en file.
+        start = time.perf_counter()
+        worker.add_many([row("b"), row("c")])
+        worker.remove("a")
+        worker.write_income("1200")
+        self.assertLess(time.perf_counter() - start, WRITE_SECONDS / 4)
+        self.assertTrue(worker.status().writing)
+        self.assertTrue(worker.flush(5))
+
+    def test_add_then_remove_never_reaches_storage(self):
+        repository = SlowRepository()
+        worker = self.worker(repository)
+        worker.add_many([row("a"), row("b")])
+        worker.remove("a")
+        worker.replace_many([row("b")])
+        self.assertTrue(worker.flush(5))
+        self.assertEqual(repository.calls, [("add_many", ["b"]), ("sync",)])
+
+    def test_flush_times_out_while_writing(self):
+        repository = SlowRepository()
+        worker = self.worker(repository)
+        worker.add(row("a"))
+        self.assertFalse(worker.flush(WRITE_SECONDS / 4))
+        self.assertTrue(worker.flush(5))
+        self.assertEqual(worker.status().pending, 0)
+
+    def test_failed_sync_is_reported_then_retried(self):
+        repository = SlowRepository(sync_failures=1)
+        worker = self.worker(repository)
+        worker.add(row("a"))
+        self.assertFalse(worker.flush(5))
+        self.assertIsInstance(worker.status().error, OSError)
+        self.assertTrue(worker.close(5))
+        self.assertIsNone(worker.status().error)
+        # Le lot n'est pas réécrit: seule la synchronisation est rejouée.
+        self.assertEqual(repository.calls, [("add_many", ["a"]), ("sync",)])
+
+    def test_close_fails_while_sync_keeps_failing(self):
+        repository = SlowRepository(sync_failures=1000)
+        worker = PersistenceWorker(repository)
+        worker.add(row("a"))
+        self.assertFalse(worker.close(5))
+        self.assertFalse(worker.close(5))
+        repository.sync_failures = 0
+        self.assertTrue(worker.close(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
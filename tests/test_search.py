@@ -0,0 +1,80 @@
+"""Recherche dans les descriptions: index tenu à jour par ajouts, suppressions et compactages."""
+import random
+import unittest
+from unittest import mock
+
+from expense_tracker import Expense, ExpenseManager, expense_columns
+from expense_tracker.search import build_postings, tokenize
+
+WORDS = ["Café", "cafétéria", "Loyer", "Électricité", "marché", "Taxi", "train"]
+QUERIES = ["caf", "cafe", "électr", "ELEC", "marche taxi", "t", "zzz", ""]
+
+
+def matches(description, text):
+    # Référence sans index: chaque mot de `text` commence un mot de la description.
+    words = tokenize(description)
+    return all(any(word.startswith(query) for word in words) for query in tokenize(text))
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(1)
+        self.count = 0
+
+    def expense(self):
+        self.count += 1
+        description = " ".join(self.rng.sample(WORDS, self.rng.randint(0, 3)))
+        return Expense(self.rng.randint(1, 9999) / 100, "Alimentation", f"2024-03-{self.rng.randint(1, 28):02d}",
+                       f"id-{self.count}", description)
+
+    def assertSearchMatchesScan(self, manager):
+        expenses = list(manager)
+        for text in QUERIES:
+            expected = [expense.id for expense in expenses if matches(expense.description, text)]
+            self.assertEqual(manager.search(text), expected, text)
+        expected = [expense.id for expense in expenses if matches(expense.description, "caf") and expense.amount >= 50]
+        self.assertEqual(manager.search("caf", min_amount=50), expected)
+
+    def test_index_is_remapped_by_compaction(self):
+        manager = ExpenseManager()
+        manager.add_columns(*expense_columns([self.expense() for _ in range(400)]))
+        manager.index_descriptions()
+        index = manager._search_index
+        with mock.patch.object(manager, "_compact", wraps=manager._compact) as compact:
+            for step in range(1200):
+                ids = manager.ids()
+                if ids and self.rng.random() < 0.55:
+                    manager.remove_expenses(self.rng.sample(ids, min(len(ids), self.rng.randint(1, 20))))
+                else:
+                    manager.add_expense(self.expense())
+                if step % 200 == 199:
+                    self.assertSearchMatchesScan(manager)
+        # Compactages faits sans reconstruire l'index.
+        self.assertGreater(compact.call_count, 0)
+        self.assertIs(manager._search_index, index)
+        self.assertSearchMatchesScan(manager)
+
+    def test_postings_match_tokenized_add(self):
+        batches = [[self.expense() for _ in range(100)] for _ in range(3)]
+        tokenized, prebuilt = ExpenseManager(), ExpenseManager()
+        for manager in (tokenized, prebuilt):
+            manager.index_descriptions()
+        for batch in batches:
+            columns = expense_columns(batch)
+            tokenized.add_columns(*columns)
+            prebuilt.add_columns(*columns, postings=build_postings(columns[4]))
+        for text in QUERIES:
+            self.assertEqual(prebuilt.search(text), tokenized.search(text), text)
+        self.assertSearchMatchesScan(prebuilt)
+
+    def test_index_built_late_matches_scan(self):
+        manager = ExpenseManager()
+        for _ in range(300):
+            manager.add_expense(self.expense())
+        manager.remove_expenses(manager.ids()[::2])
+        self.assertIsNone(manager._search_index)
+        self.assertSearchMatchesScan(manager)
+
+
+if __name__ == "__main__":
+    unittest.main()
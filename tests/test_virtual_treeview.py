@@ -0,0 +1,117 @@
+"""Sélection du VirtualTreeview, avec un faux widget (pas d'affichage requis)."""
+import importlib.util
+import os
+import unittest
+from types import SimpleNamespace
+
+from expense_tracker import Expense
+from expense_tracker.models import ExpenseManager
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "daily expense tracker.py")
+
+
+def load_gui():
+    spec = importlib.util.spec_from_file_location("daily_expense_tracker", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeTree:
+    """Ce que VirtualTreeview utilise d'un Treeview en mode "extended"."""
+
+    def __init__(self, height):
+        self.options = {"height": height, "selectmode": "extended"}
+        self.bindings = {}
+        self.rows = []
+        self.selected = []
+
+    def cget(self, option):
+        return self.options[option]
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def bind(self, sequence, handler, add=None):
+        self.bindings[sequence] = handler
+
+    def insert(self, parent, index, iid, values):
+        self.rows.append(iid)
+
+    def delete(self, *ids):
+        self.rows = [id for id in self.rows if id not in ids]
+        self.selected = [id for id in self.selected if id not in ids]
+
+    def selection(self):
+        return tuple(self.selected)
+
+    def selection_set(self, ids):
+        # Comme Tk: tout changement de sélection émet <<TreeviewSelect>>.
+        self.selected = list(ids)
+        self.bindings["<<TreeviewSelect>>"](None)
+
+    def identify_row(self, y):
+        return self.rows[y] if 0 <= y < len(self.rows) else ""
+
+    def focus(self, id=None):
+        return self.selected[-1] if self.selected else ""
+
+    def click(self, row, state=0):
+        # Classe Treeview: clic simple = sélection remplacée, Ctrl = ajout.
+        id = self.rows[row]
+        self.bindings["<ButtonPress-1>"](SimpleNamespace(y=row, state=state))
+        self.selection_set(self.selected + [id] if state else [id])
+        return id
+
+
+class VirtualTreeviewSelectionTest(unittest.TestCase):
+    def setUp(self):
+        gui = load_gui()
+        self.control = gui.CONTROL_MASK
+        self.manager = ExpenseManager()
+        for day in range(1, 29):
+            self.manager.add_expense(Expense(float(day), "Alimentation", f"2024-02-{day:02d}", f"id-{day:02d}", ""))
+        self.tree = FakeTree(height=5)
+        self.view = gui.VirtualTreeview(self.tree, SimpleNamespace(configure=lambda **_: None, set=lambda *_: None),
+                                        self.manager)
+        self.view.set_ids(sorted(self.manager.ids()))
+
+    def delete_selection(self):
+        # Comme ExpenseApp.delete_expense.
+        selected = self.view.selection()
+        self.manager.remove_expenses(selected)
+        self.view.delete_many(selected)
+        return selected
+
+    def test_plain_click_after_scroll_replaces_selection(self):
+        self.tree.click(1)
+        self.view._scroll_by(10)
+        clicked = self.tree.click(2)
+        self.assertEqual(self.view.selection(), (clicked,))
+        self.assertEqual(self.delete_selection(), (clicked,))
+        self.assertIn("id-02", self.manager.ids())
+        self.assertEqual(len(self.manager), 27)
+
+    def test_scroll_keeps_selection_out_of_window(self):
+        first = self.tree.click(1)
+        self.view._scroll_by(10)
+        self.view._scroll_by(-10)
+        self.assertEqual(self.view.selection(), (first,))
+
+    def test_control_click_extends_selection_out_of_window(self):
+        first = self.tree.click(1)
+        self.view._scroll_by(10)
+        second = self.tree.click(2, state=self.control)
+        self.assertEqual(self.view.selection(), (first, second))
+        self.assertEqual(self.delete_selection(), (first, second))
+        self.assertEqual(len(self.manager), 26)
+
+    def test_click_outside_rows_keeps_selection(self):
+        first = self.tree.click(1)
+        self.tree.bindings["<ButtonPress-1>"](SimpleNamespace(y=99, state=0))
+        self.view._scroll_by(10)
+        self.assertEqual(self.view.selection(), (first,))
+
+
+if __name__ == "__main__":
+    unittest.main()